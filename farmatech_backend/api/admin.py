@@ -1,10 +1,122 @@
 # farmatech_backend/api/admin.py
 
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
 from .models import Farmacia, Medicamento, Movimento, Venda, ItemVenda # NOVO: Importar ItemVenda
 
-admin.site.register(Farmacia)
-admin.site.register(Medicamento)
-admin.site.register(Movimento)
-admin.site.register(Venda)
-admin.site.register(ItemVenda) # NOVO: Registrar ItemVenda
\ No newline at end of file
+# A partir deste número de linhas a listagem sem filtros usa a contagem estimada do PostgreSQL
+CONTAGEM_ESTIMADA_MINIMA = 10000
+
+
+# Evita o COUNT(*) completo nas listagens grandes do admin
+# Com filtro ou busca a contagem continua exata (o resultado costuma ser pequeno)
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= CONTAGEM_ESTIMADA_MINIMA:
+                return row[0]
+        return super().count
+
+
+class BaseAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False # Não roda um segundo COUNT(*) quando há busca/filtro
+    list_per_page = 50
+    # Buscas por igualdade, somadas (OR) às de search_fields. Não entram em search_fields
+    # porque lá '=campo' vira UPPER(campo::text) = UPPER(...), que não usa índice
+    busca_por_numero = ['pk'] # Campos inteiros, só quando o termo é numérico
+    busca_exata = [] # Campos de texto comparados sem transformação
+
+    def get_search_fields(self, request):
+        # Mantém a caixa de busca mesmo sem campos de prefixo
+        return super().get_search_fields(request) or ['pk']
+
+    def get_search_results(self, request, queryset, search_term):
+        termo = search_term.strip()
+        if not termo:
+            return queryset, False
+        if self.search_fields:
+            resultado, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        else:
+            resultado, may_have_duplicates = queryset.none(), False
+        filtro = Q()
+        if termo.isdigit():
+            for campo in self.busca_por_numero:
+                filtro |= Q(**{campo: int(termo)})
+        for campo in self.busca_exata:
+            filtro |= Q(**{campo: termo})
+        if filtro:
+            resultado = resultado | queryset.filter(filtro)
+        return resultado, may_have_duplicates
+
+
+@admin.register(Farmacia)
+class FarmaciaAdmin(BaseAdmin):
+    list_display = ['id', 'nome', 'responsavel', 'telefone', 'cidade', 'estado', 'user']
+    list_select_related = ['user']
+    search_fields = ['^nome', '^user__email']
+    raw_id_fields = ['user']
+
+
+@admin.register(Medicamento)
+class MedicamentoAdmin(BaseAdmin):
+    list_display = ['id', 'nome', 'farmacia', 'categoria', 'quantidade', 'quantidade_minima', 'preco', 'data_vencimento']
+    list_select_related = ['farmacia']
+    search_fields = ['^nome']
+    autocomplete_fields = ['farmacia']
+    date_hierarchy = 'data_vencimento'
+
+
+@admin.register(Movimento)
+class MovimentoAdmin(BaseAdmin):
+    list_display = ['id', 'data', 'tipo', 'quantidade', 'medicamento']
+    list_select_related = ['medicamento']
+    list_filter = ['tipo']
+    search_fields = ['^medicamento__nome']
+    autocomplete_fields = ['medicamento']
+    date_hierarchy = 'data'
+    ordering = ['-data']
+
+
+class ItemVendaInline(admin.TabularInline):
+    model = ItemVenda
+    extra = 0
+    autocomplete_fields = ['medicamento']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('medicamento')
+
+
+@admin.register(Venda)
+class VendaAdmin(BaseAdmin):
+    list_display = ['id', 'data', 'farmacia', 'forma_pagamento', 'total']
+    list_select_related = ['farmacia']
+    list_filter = ['forma_pagamento']
+    search_fields = []
+    busca_exata = ['client_id']
+    autocomplete_fields = ['farmacia']
+    date_hierarchy = 'data'
+    ordering = ['-data']
+    inlines = [ItemVendaInline]
+
+
+@admin.register(ItemVenda)
+class ItemVendaAdmin(BaseAdmin):
+    list_display = ['id', 'venda', 'medicamento', 'quantidade', 'preco_unitario']
+    list_select_related = ['venda', 'medicamento']
+    search_fields = ['^medicamento__nome']
+    busca_por_numero = ['pk', 'venda_id']
+    autocomplete_fields = ['medicamento']
+    raw_id_fields = ['venda']
@@ -0,0 +1,58 @@
+# farmatech_backend/api/ai.py
+
+# Cliente do modelo de IA (Gemini) inicializado sob demanda.
+# O SDK google.generativeai é pesado: importá-lo no carregamento das views fazia
+# cada worker do gunicorn e cada comando (migrate, collectstatic) pagar esse custo.
+# Aqui ele só é importado na primeira análise, dentro do processo que a atende.
+# O cliente é recriado se o processo mudou (fork do gunicorn com preload_app),
+# pois conexões gRPC não sobrevivem a um fork.
+
+import os
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+_lock = threading.Lock()
+_modelo = None
+_pid = None
+
+
+def _criar_modelo():
+    # A chave é verificada antes do import: sem ela o SDK nem precisa estar instalado
+    api_key = getattr(settings, 'GEMINI_API_KEY', None)
+    if not api_key:
+        raise ImproperlyConfigured('GEMINI_API_KEY não configurada.')
+
+    import google.generativeai as genai
+
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(getattr(settings, 'GEMINI_MODEL', 'gemini-1.5-flash-latest'))
+
+
+def get_model():
+    """Retorna o modelo generativo do processo atual, criando-o na primeira chamada."""
+    global _modelo, _pid
+    pid = os.getpid()
+    if _modelo is None or _pid != pid:
+        with _lock:
+            if _modelo is None or _pid != pid:
+                _modelo = _criar_modelo()
+                _pid = pid
+    return _modelo
+
+
+def reset():
+    """Descarta o cliente atual (ex.: após um fork ou nos testes)."""
+    global _modelo, _pid
+    with _lock:
+        _modelo = None
+        _pid = None
+
+
+def generate(prompt):
+    return get_model().generate_content(prompt).text
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=lambda: globals().update(_modelo=None, _pid=None, _lock=threading.Lock()))
@@ -0,0 +1,68 @@
+# farmatech_backend/api/ai_views.py
+
+# Views que usam o modelo de IA ficam separadas de api/views.py para que o
+# restante da API não dependa do SDK do Gemini.
+
+import logging
+
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .models import Farmacia
+from .prompt_digest import build_digest, estimate_tokens
+from . import ai
+
+logger = logging.getLogger(__name__)
+
+
+# View para Análise de IA (INTEGRAÇÃO COM GEMINI)
+class AiAnalyzeView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        try:
+            farmacia = request.user.farmacia
+        except Farmacia.DoesNotExist:
+            logger.info('Análise de IA: usuário %s sem farmácia.', request.user.pk)
+            return Response({'detail': 'Farmácia do usuário não encontrada.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # Resumo agregado no banco e limitado por settings.AI_PROMPT_TOKEN_BUDGET (ver api/prompt_digest.py)
+            digest, totais = build_digest(farmacia)
+            logger.info('Resumo para o prompt da farmácia %s: ~%s tokens.', farmacia.id, estimate_tokens(digest))
+
+            prompt = (
+                f"Você é um analista de dados de farmácia inteligente. Analise os seguintes dados "
+                f"da Farmácia '{farmacia.nome}' e forneça insights sobre o estoque, vendas e movimentações.\n"
+                f"Os insights devem cobrir: Visão Geral, Tendências, Alertas e Recomendações.\n"
+                f"Formate a resposta de forma clara, usando títulos e bullet points, mas em texto corrido e não JSON.\n"
+                f"Os dados abaixo são um resumo estatístico; as amostras de linhas não representam o histórico completo.\n\n"
+                f"--- Dados da Farmácia ---\n"
+                f"{digest or '- N/A'}\n\n"
+                f"--- Análise Solicitada ---\n"
+                f"1. Visão Geral do Período: Resumo dos principais números (total de unidades em estoque, total de vendas, etc.).\n"
+                f"2. Insights de Tendência: Quais padrões ou mudanças você observa nos dados de vendas ou estoque ao longo do tempo? Há picos, quedas, sazonalidade?\n"
+                f"3. Alertas de Anomalias: Existem dados incomuns, discrepâncias ou situações que requerem atenção imediata (ex: estoque negativo, vendas muito altas/baixas de um item específico)?\n"
+                f"4. Recomendações: Com base na análise, quais ações você sugere para otimizar o estoque, aumentar vendas ou melhorar a gestão da farmácia?\n"
+                f"--- Fim da Análise Solicitada ---\n"
+            )
+            logger.info('Prompt da farmácia %s construído; enviando ao modelo de IA.', farmacia.id)
+
+            # Cliente criado sob demanda (ver api/ai.py); modelo em settings.GEMINI_MODEL
+            ai_summary = ai.generate(prompt)
+            logger.info('Resposta do modelo de IA recebida para a farmácia %s.', farmacia.id)
+
+            return Response({
+                'success': True,
+                'summary': ai_summary,
+                'data': totais, # Totais para gráficos: total_entradas, total_saidas, total_vendas_valor, medicamentos_em_estoque
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.exception('Erro ao chamar o modelo de IA ou processar os dados da farmácia %s.', farmacia.id)
+            return Response({
+                'success': False,
+                'summary': 'Erro ao gerar insights de IA. Por favor, tente novamente mais tarde. (Detalhes: ' + str(e) + ')',
+                'data': {}
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
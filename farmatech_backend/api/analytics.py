@@ -0,0 +1,144 @@
+# farmatech_backend/api/analytics.py
+
+# Análises de estoque e vendas calculadas no banco, em um número fixo de consultas:
+#  1. por medicamento: receita e unidades vendidas na janela, última venda e a
+#     receita acumulada (funções de janela) para a curva ABC;
+#  2. por categoria: valor do estoque (quantidade × preço).
+# Giro (sell-through) e estoque parado são derivados da primeira consulta.
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, IntegerField, Max, OuterRef, Subquery, Sum, Value, Window
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ItemVenda, Medicamento
+
+# Limites da curva ABC sobre a receita acumulada
+LIMITE_A = Decimal('0.80')
+LIMITE_B = Decimal('0.95')
+
+CENTAVOS = Decimal('0.01')
+ZERO = Value(Decimal('0'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def _dinheiro(valor):
+    return str((valor or Decimal('0')).quantize(CENTAVOS))
+
+
+def _classe(acumulado_anterior, total):
+    # O item entra na classe em que a receita acumulada ANTES dele se encontra,
+    # assim o item que cruza os 80% ainda é classe A
+    if not total:
+        return 'C'
+    fracao = acumulado_anterior / total
+    if fracao < LIMITE_A:
+        return 'A'
+    if fracao < LIMITE_B:
+        return 'B'
+    return 'C'
+
+
+def calcular_analytics(farmacia, dias=90, dias_sem_venda=60, categoria=None):
+    agora = timezone.now()
+    inicio = agora - timedelta(days=dias)
+    limite_parado = agora - timedelta(days=dias_sem_venda)
+
+    medicamentos = Medicamento.objects.filter(farmacia=farmacia)
+    if categoria:
+        medicamentos = medicamentos.filter(categoria=categoria)
+
+    # Subconsultas correlacionadas (e não GROUP BY) para que a função de janela
+    # possa somar a receita por cima delas
+    itens = ItemVenda.objects.filter(medicamento=OuterRef('pk')).order_by().values('medicamento')
+    itens_janela = itens.filter(venda__data__gte=inicio)
+    receita = Subquery(
+        itens_janela.annotate(total=Sum(F('quantidade') * F('preco_unitario'))).values('total'),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+    unidades = Subquery(itens_janela.annotate(total=Sum('quantidade')).values('total'), output_field=IntegerField())
+    ultima_venda = Subquery(itens.annotate(ultima=Max('venda__data')).values('ultima'))
+
+    linhas = (
+        medicamentos
+        .annotate(
+            receita=Coalesce(receita, ZERO),
+            unidades_vendidas=Coalesce(unidades, Value(0)),
+            ultima_venda=ultima_venda,
+        )
+        .annotate(
+            receita_acumulada=Window(Sum('receita'), order_by=[F('receita').desc(), F('id').asc()]),
+            receita_total=Window(Sum('receita')),
+        )
+        .order_by('-receita', 'id')
+        .values('id', 'nome', 'categoria', 'quantidade', 'preco', 'receita', 'unidades_vendidas',
+                'ultima_venda', 'receita_acumulada', 'receita_total')
+    )
+
+    abc = []
+    parados = []
+    resumo_abc = {classe: {'itens': 0, 'receita': Decimal('0')} for classe in 'ABC'}
+    for linha in linhas:
+        total = linha['receita_total'] or Decimal('0')
+        acumulado_anterior = (linha['receita_acumulada'] or Decimal('0')) - linha['receita']
+        classe = _classe(acumulado_anterior, total)
+        resumo_abc[classe]['itens'] += 1
+        resumo_abc[classe]['receita'] += linha['receita']
+
+        vendidas = linha['unidades_vendidas']
+        disponivel = vendidas + max(linha['quantidade'], 0)
+        abc.append({
+            'medicamento_id': linha['id'],
+            'nome': linha['nome'],
+            'categoria': linha['categoria'],
+            'classe': classe,
+            'receita': _dinheiro(linha['receita']),
+            'participacao': round(float(linha['receita'] / total), 4) if total else 0.0,
+            'participacao_acumulada': round(float(linha['receita_acumulada'] / total), 4) if total else 0.0,
+            'unidades_vendidas': vendidas,
+            'estoque_atual': linha['quantidade'],
+            'sell_through': round(vendidas / disponivel, 4) if disponivel else 0.0,
+        })
+
+        if linha['quantidade'] > 0 and (linha['ultima_venda'] is None or linha['ultima_venda'] < limite_parado):
+            parados.append({
+                'medicamento_id': linha['id'],
+                'nome': linha['nome'],
+                'categoria': linha['categoria'],
+                'quantidade': linha['quantidade'],
+                'valor_parado': _dinheiro(linha['quantidade'] * linha['preco']),
+                'ultima_venda': linha['ultima_venda'],
+            })
+
+    valor_por_categoria = [
+        {
+            'categoria': linha['categoria'],
+            'itens': linha['itens'],
+            'unidades': linha['unidades'],
+            'valor_estoque': _dinheiro(linha['valor_estoque']),
+        }
+        for linha in (
+            medicamentos
+            .values('categoria')
+            .annotate(
+                itens=Count('id'),
+                unidades=Sum('quantidade'),
+                valor_estoque=Sum(F('quantidade') * F('preco'),
+                                  output_field=DecimalField(max_digits=14, decimal_places=2)),
+            )
+            .order_by('-valor_estoque', 'categoria')
+        )
+    ]
+
+    return {
+        'periodo': {'inicio': inicio, 'fim': agora, 'dias': dias, 'dias_sem_venda': dias_sem_venda},
+        'categoria': categoria,
+        'abc': abc,
+        'resumo_abc': {
+            classe: {'itens': dados['itens'], 'receita': _dinheiro(dados['receita'])}
+            for classe, dados in resumo_abc.items()
+        },
+        'valor_estoque_por_categoria': valor_por_categoria,
+        'estoque_parado': parados,
+    }
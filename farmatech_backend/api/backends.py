@@ -0,0 +1,22 @@
+# farmatech_backend/api/backends.py
+
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+
+
+# Igual ao ModelBackend, mas já traz a farmácia do usuário na mesma consulta
+# (login_view devolve farmacia_id sem precisar de outra ida ao banco)
+class FarmaciaModelBackend(ModelBackend):
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return
+        try:
+            user = User._default_manager.select_related('farmacia').get(**{User.USERNAME_FIELD: username})
+        except User.DoesNotExist:
+            # Roda o hasher uma vez para reduzir a diferença de tempo entre usuário existente e inexistente
+            User().set_password(password)
+        else:
+            if user.check_password(password) and self.user_can_authenticate(user):
+                return user
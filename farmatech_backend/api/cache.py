@@ -0,0 +1,173 @@
+# farmatech_backend/api/cache.py
+
+# Cache de respostas por farmácia (catálogo de medicamentos e perfil da farmácia).
+# Usa o framework de cache do Django (settings.CACHES - Redis quando REDIS_URL está
+# definido). Com memória local e mais de um worker o cache do catálogo fica
+# desativado: a troca de versão feita por um worker não chegaria aos outros.
+#
+# Invalidação: cada farmácia tem um número de versão por namespace, que faz parte
+# da chave das entradas. Os signals (api/signals.py) e as atualizações de estoque
+# em lote chamam invalidate(), que troca a versão; entradas antigas ficam órfãs e
+# expiram sozinhas.
+#
+# Proteção contra stampede: a entrada guarda seu próprio vencimento lógico e
+# fica no cache por mais CACHE_GRACE segundos. Quando vence, só quem conseguir o
+# lock (cache.add) recalcula; os demais continuam servindo o valor anterior.
+# Sem nenhum valor, quem não pegou o lock espera um pouco pelo resultado.
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+CACHE_GRACE = 30
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 0.05
+LOCK_WAIT_STEPS = 20
+
+METRICAS = ('hit', 'stale', 'miss')
+
+
+def get_cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+
+def cache_por_processo():
+    """True quando o cache é local a cada processo e há mais de um worker."""
+    return isinstance(get_cache(), LocMemCache) and getattr(settings, 'WEB_CONCURRENCY', 1) > 1
+
+
+def cache_timeout():
+    if cache_por_processo():
+        return 0
+    return getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+
+
+def _versao_key(namespace, farmacia_id):
+    return f'farmatech:{namespace}:{farmacia_id}:versao'
+
+
+def _nova_versao():
+    # Baseada no relógio para não repetir versões antigas se a chave for despejada do cache
+    return time.time_ns()
+
+
+def get_versao(namespace, farmacia_id):
+    cache = get_cache()
+    key = _versao_key(namespace, farmacia_id)
+    versao = cache.get(key)
+    if versao is None:
+        cache.add(key, _nova_versao(), timeout=None)
+        versao = cache.get(key)
+    return versao
+
+
+def _trocar_versao(namespace, farmacia_id):
+    cache = get_cache()
+    key = _versao_key(namespace, farmacia_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _nova_versao(), timeout=None)
+
+
+def invalidate(namespace, farmacia_id):
+    """Invalida todas as entradas de um namespace para a farmácia."""
+    if farmacia_id is None:
+        return
+    _trocar_versao(namespace, farmacia_id)
+    # De novo após o commit: uma leitura concorrente pode ter gravado dados antigos
+    # entre a alteração e o commit da transação
+    transaction.on_commit(lambda: _trocar_versao(namespace, farmacia_id))
+
+
+def invalidate_catalog(farmacia_id):
+    invalidate('medicamentos', farmacia_id)
+
+
+def invalidate_farmacia(farmacia_id):
+    invalidate('farmacia', farmacia_id)
+
+
+def build_key(namespace, farmacia_id, path):
+    pagina = hashlib.md5(path.encode()).hexdigest()
+    return f'farmatech:{namespace}:{farmacia_id}:v{get_versao(namespace, farmacia_id)}:{pagina}'
+
+
+def _registrar(metrica):
+    cache = get_cache()
+    key = f'farmatech:metricas:{metrica}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_metricas():
+    cache = get_cache()
+    valores = cache.get_many([f'farmatech:metricas:{m}' for m in METRICAS])
+    metricas = {m: valores.get(f'farmatech:metricas:{m}', 0) for m in METRICAS}
+    total = sum(metricas.values())
+    metricas['hit_rate'] = round((metricas['hit'] + metricas['stale']) / total, 4) if total else None
+    return metricas
+
+
+def get_or_compute(key, compute):
+    """Retorna o valor em cache para key ou calcula com compute(), evitando stampede."""
+    cache = get_cache()
+    timeout = cache_timeout()
+    lock_key = f'{key}:lock'
+
+    entrada = cache.get(key)
+    if entrada is not None:
+        vence_em, valor = entrada
+        if vence_em > time.time():
+            _registrar('hit')
+            return valor
+        if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            # Outro processo já está recalculando: serve o valor anterior
+            _registrar('stale')
+            return valor
+        locked = True
+    else:
+        locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+        if not locked:
+            for _ in range(LOCK_WAIT_STEPS):
+                time.sleep(LOCK_WAIT)
+                entrada = cache.get(key)
+                if entrada is not None:
+                    _registrar('hit')
+                    return entrada[1]
+
+    _registrar('miss')
+    try:
+        valor = compute()
+        cache.set(key, (time.time() + timeout, valor), timeout + CACHE_GRACE)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return valor
+
+
+def get_farmacia_id(user):
+    """Id da farmácia do usuário, sem consultar o banco quando já está em cache."""
+    cache = get_cache()
+    key = f'farmatech:user:{user.pk}:farmacia_id'
+    farmacia_id = cache.get(key)
+    if farmacia_id is None:
+        from .models import Farmacia
+        farmacia_id = Farmacia.objects.filter(user=user).values_list('id', flat=True).first()
+        if farmacia_id is not None:
+            cache.set(key, farmacia_id, timeout=None)
+    return farmacia_id
+
+
+def forget_farmacia_id(user_id):
+    key = f'farmatech:user:{user_id}:farmacia_id'
+    get_cache().delete(key)
+    # De novo após o commit: uma leitura concorrente pode ter gravado o valor antigo
+    transaction.on_commit(lambda: get_cache().delete(key))
@@ -0,0 +1,32 @@
+# farmatech_backend/api/checks.py
+
+# Verificações de configuração (python manage.py check, e na subida do servidor)
+
+from django.conf import settings
+from django.core.checks import Warning, register
+
+from .cache import cache_por_processo
+
+
+@register()
+def cache_compartilhado(app_configs, **kwargs):
+    if not cache_por_processo():
+        return []
+    return [Warning(
+        'Cache em memória local com WEB_CONCURRENCY={}: o cache do catálogo fica desativado.'.format(
+            settings.WEB_CONCURRENCY),
+        hint='Defina REDIS_URL (ou outro backend compartilhado em CACHES) para cachear entre workers.',
+        id='api.W001',
+    )]
+
+
+@register()
+def broker_entre_processos(app_configs, **kwargs):
+    if getattr(settings, 'WEB_CONCURRENCY', 1) <= 1 or not settings.EVENT_BROKER.endswith('.InProcessBroker'):
+        return []
+    return [Warning(
+        'EVENT_BROKER entrega só dentro do processo, mas WEB_CONCURRENCY={}: '
+        'eventos gravados em um worker não chegam às conexões abertas em outro.'.format(settings.WEB_CONCURRENCY),
+        hint='Defina REDIS_URL (usa api.events.RedisBroker).',
+        id='api.W002',
+    )]
@@ -0,0 +1,183 @@
+# farmatech_backend/api/event_views.py
+
+# Stream de eventos (SSE) por farmácia: GET /api/events/
+# O EventSource do navegador não envia cabeçalhos. Em vez do token JWT na URL
+# (que acabaria nos logs de acesso do gunicorn e do nginx), o cliente pede um
+# ticket em POST /api/events/ticket/ (autenticado pelo JWT) e abre
+# /api/events/?ticket=...; o ticket é assinado, vale por TICKET_TTL segundos e
+# só pode ser usado uma vez. Clientes que enviam cabeçalhos continuam podendo
+# usar Authorization: Bearer. O stream termina (evento 'expirado') quando o
+# token de acesso que o autorizou expira; o cliente pede um novo ticket e
+# reconecta. Sob ASGI (asgi.py) cada conexão é só uma tarefa no
+# event loop; sob WSGI ela ocupa uma thread do worker enquanto estiver aberta, por
+# isso o número de streams simultâneos por worker é limitado
+# (settings.EVENT_STREAM_MAX_SYNC) e o excedente recebe 503 com Retry-After.
+
+import secrets
+import threading
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .cache import get_cache, get_farmacia_id
+from .events import get_broker
+
+KEEPALIVE = 15 # segundos sem eventos até enviar um comentário (mantém proxies com a conexão aberta)
+ABERTURA = 'retry: 3000\n: conectado\n\n'
+MANTER_VIVA = ': keepalive\n\n'
+EXPIRADO = 'event: expirado\ndata: {}\n\n'
+TENTAR_DE_NOVO = 30 # Retry-After (segundos) quando o worker já tem streams demais
+TICKET_TTL = 30 # segundos para abrir o stream depois de pedir o ticket
+TICKET_SALT = 'api.event_views.ticket'
+
+_streams_sync = 0
+_streams_sync_lock = threading.Lock()
+
+
+def _reservar_stream_sync():
+    global _streams_sync
+    with _streams_sync_lock:
+        if _streams_sync >= getattr(settings, 'EVENT_STREAM_MAX_SYNC', 2):
+            return False
+        _streams_sync += 1
+        return True
+
+
+def _liberar_stream_sync():
+    global _streams_sync
+    with _streams_sync_lock:
+        _streams_sync -= 1
+
+
+class _StreamSync:
+    """Iterador do stream WSGI que devolve a vaga ao ser fechado, mesmo sem ter sido iniciado."""
+
+    def __init__(self, eventos):
+        self.eventos = eventos
+        self.fechado = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.eventos)
+
+    def close(self):
+        if not self.fechado:
+            self.fechado = True
+            self.eventos.close()
+            _liberar_stream_sync()
+
+
+def _expiracao(token):
+    """Momento (epoch) em que o token de acesso expira."""
+    if token is not None and 'exp' in token:
+        return int(token['exp'])
+    # Autenticação sem JWT (ex.: force_authenticate nos testes): vida padrão do token de acesso
+    return int(time.time() + jwt_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+
+
+def _do_cabecalho(request):
+    autenticacao = JWTAuthentication()
+    header = autenticacao.get_header(request)
+    token = autenticacao.get_raw_token(header) if header else None
+    if not token:
+        return None
+    try:
+        validado = autenticacao.get_validated_token(token)
+        user = autenticacao.get_user(validado)
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+    return get_farmacia_id(user), _expiracao(validado)
+
+
+def _do_ticket(request):
+    ticket = request.GET.get('ticket')
+    if not ticket:
+        return None
+    try:
+        dados = signing.loads(ticket, salt=TICKET_SALT, max_age=TICKET_TTL)
+    except signing.BadSignature:
+        return None
+    # Uso único: a primeira conexão marca o ticket como usado
+    if not get_cache().add(f"farmatech:eventos:ticket:{dados['n']}", 1, TICKET_TTL):
+        return None
+    return dados['f'], dados['exp']
+
+
+class EventTicketView(APIView):
+    """POST /api/events/ticket/: ticket de uso único para abrir o stream de eventos."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        farmacia_id = get_farmacia_id(request.user)
+        if farmacia_id is None:
+            return Response({'detail': 'Farmácia do usuário não encontrada.'}, status=status.HTTP_400_BAD_REQUEST)
+        ticket = signing.dumps(
+            {'f': farmacia_id, 'exp': _expiracao(request.auth), 'n': secrets.token_urlsafe(12)}, salt=TICKET_SALT)
+        return Response({'ticket': ticket, 'expira_em': TICKET_TTL})
+
+
+async def _eventos_async(farmacia_id, expira_em):
+    assinatura = get_broker().assinar(farmacia_id)
+    try:
+        yield ABERTURA
+        while not assinatura.transbordou:
+            restante = expira_em - time.time()
+            if restante <= 0:
+                yield EXPIRADO
+                return
+            mensagem = await assinatura.proxima(min(KEEPALIVE, restante))
+            yield MANTER_VIVA if mensagem is None else mensagem
+    finally:
+        assinatura.fechar()
+
+
+def _eventos_sync(farmacia_id, expira_em):
+    assinatura = get_broker().assinar(farmacia_id, assincrona=False)
+    try:
+        yield ABERTURA
+        while not assinatura.transbordou:
+            restante = expira_em - time.time()
+            if restante <= 0:
+                yield EXPIRADO
+                return
+            mensagem = assinatura.proxima(min(KEEPALIVE, restante))
+            yield MANTER_VIVA if mensagem is None else mensagem
+    finally:
+        assinatura.fechar()
+
+
+def event_stream_view(request):
+    if request.method != 'GET':
+        return JsonResponse({'detail': 'Método não permitido.'}, status=405)
+
+    credenciais = _do_cabecalho(request) or _do_ticket(request)
+    if credenciais is None or credenciais[0] is None:
+        return JsonResponse({'detail': 'Ticket ou token inválido, ou farmácia não encontrada.'}, status=401)
+    farmacia_id, expira_em = credenciais
+
+    if isinstance(request, ASGIRequest):
+        eventos = _eventos_async(farmacia_id, expira_em)
+    elif _reservar_stream_sync():
+        eventos = _StreamSync(_eventos_sync(farmacia_id, expira_em))
+    else:
+        # As threads restantes ficam para as requisições comuns da API
+        response = JsonResponse({'detail': 'Limite de streams de eventos deste servidor atingido.'}, status=503)
+        response['Retry-After'] = str(TENTAR_DE_NOVO)
+        return response
+    response = StreamingHttpResponse(eventos, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no' # nginx: não bufferizar o stream
+    return response
@@ -0,0 +1,245 @@
+# farmatech_backend/api/events.py
+
+# Eventos de estoque e vendas em tempo real por farmácia (Server-Sent Events).
+# Substitui o polling das telas de Dashboard/Estoque: cada alteração confirmada
+# (venda, movimento, edição de medicamento) gera um evento pequeno que é
+# entregue a todas as conexões abertas daquela farmácia.
+#
+# O broker é plugável (settings.EVENT_BROKER). Cada processo mantém um único
+# canal por farmácia, compartilhado por todas as conexões locais. O RedisBroker
+# (padrão quando REDIS_URL está definido) entrega entre todos os workers via
+# Redis pub/sub: o processo assina o canal da farmácia no Redis enquanto houver
+# conexões locais. O InProcessBroker entrega apenas dentro do processo (testes e
+# desenvolvimento com um único processo).
+
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Conexões que acumulam mais que isso são encerradas (o cliente reconecta e recarrega as listas)
+MAX_PENDENTES = 1000
+
+
+class Assinatura:
+    """Fila de mensagens de uma conexão."""
+
+    def __init__(self, broker, farmacia_id):
+        self.broker = broker
+        self.farmacia_id = farmacia_id
+        self.transbordou = False
+
+    def entregar(self, mensagem):
+        raise NotImplementedError
+
+    def fechar(self):
+        self.broker.cancelar(self)
+
+
+class AssinaturaAsync(Assinatura):
+    """Consumida no event loop da conexão (servidor ASGI)."""
+
+    def __init__(self, broker, farmacia_id):
+        super().__init__(broker, farmacia_id)
+        self.loop = asyncio.get_running_loop()
+        self.fila = asyncio.Queue()
+
+    def _entregar(self, mensagem):
+        if self.fila.qsize() >= MAX_PENDENTES:
+            self.transbordou = True
+            return
+        self.fila.put_nowait(mensagem)
+
+    def entregar(self, mensagem):
+        # Pode ser chamado de qualquer thread (ex.: on_commit de uma requisição síncrona)
+        try:
+            self.loop.call_soon_threadsafe(self._entregar, mensagem)
+        except RuntimeError:
+            # Event loop já encerrado: a conexão caiu e será removida ao fechar
+            pass
+
+    async def proxima(self, timeout):
+        """Próxima mensagem ou None se nada chegou dentro do timeout."""
+        try:
+            return await asyncio.wait_for(self.fila.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class AssinaturaSync(Assinatura):
+    """Consumida por uma thread do servidor WSGI (ocupa a thread enquanto a conexão durar)."""
+
+    def __init__(self, broker, farmacia_id):
+        super().__init__(broker, farmacia_id)
+        self.fila = queue.Queue()
+
+    def entregar(self, mensagem):
+        if self.fila.qsize() >= MAX_PENDENTES:
+            self.transbordou = True
+            return
+        self.fila.put_nowait(mensagem)
+
+    def proxima(self, timeout):
+        try:
+            return self.fila.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class BaseBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._canais = {}
+
+    def assinar(self, farmacia_id, assincrona=True):
+        assinatura = (AssinaturaAsync if assincrona else AssinaturaSync)(self, farmacia_id)
+        with self._lock:
+            canal = self._canais.get(farmacia_id)
+            if canal is None:
+                canal = self._canais[farmacia_id] = set()
+                self._abrir_canal(farmacia_id)
+            canal.add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            canal = self._canais.get(assinatura.farmacia_id)
+            if canal is None:
+                return
+            canal.discard(assinatura)
+            if not canal:
+                del self._canais[assinatura.farmacia_id]
+                self._fechar_canal(assinatura.farmacia_id)
+
+    def codificar(self, tipo, dados):
+        # Codificado uma única vez, independente do número de conexões.
+        # Sem campo id: não há reenvio na reconexão (Last-Event-ID não é usado), e
+        # um contador por processo se repetiria entre os workers do RedisBroker
+        corpo = json.dumps(dados, cls=DjangoJSONEncoder, separators=(',', ':'))
+        return f"event: {tipo}\ndata: {corpo}\n\n"
+
+    def _distribuir(self, farmacia_id, mensagem):
+        with self._lock:
+            assinaturas = list(self._canais.get(farmacia_id, ()))
+        for assinatura in assinaturas:
+            assinatura.entregar(mensagem)
+
+    def conexoes(self, farmacia_id):
+        with self._lock:
+            return len(self._canais.get(farmacia_id, ()))
+
+    def publicar(self, farmacia_id, tipo, dados):
+        raise NotImplementedError
+
+    def _abrir_canal(self, farmacia_id):
+        pass
+
+    def _fechar_canal(self, farmacia_id):
+        pass
+
+
+class InProcessBroker(BaseBroker):
+    def publicar(self, farmacia_id, tipo, dados):
+        self._distribuir(farmacia_id, self.codificar(tipo, dados))
+
+
+class RedisBroker(BaseBroker):
+    """Fan-out entre processos via Redis pub/sub (settings.REDIS_URL)."""
+
+    PREFIXO = 'farmatech:eventos:'
+    ESPERA = 0.2 # segundos entre verificações de novas assinaturas na thread de escuta
+    RECONEXAO = 1
+
+    def __init__(self, cliente=None):
+        super().__init__()
+        if cliente is None:
+            import redis
+            cliente = redis.Redis.from_url(settings.REDIS_URL)
+        self.cliente = cliente
+        # O objeto PubSub não é thread-safe: só a thread de escuta o usa, e as
+        # assinaturas chegam a ela por esta fila
+        self._comandos = queue.Queue()
+        self._thread = None
+
+    def _canal(self, farmacia_id):
+        return f'{self.PREFIXO}{farmacia_id}'
+
+    def publicar(self, farmacia_id, tipo, dados):
+        self.cliente.publish(self._canal(farmacia_id), self.codificar(tipo, dados))
+
+    def _abrir_canal(self, farmacia_id):
+        # Chamado com self._lock adquirido
+        self._comandos.put(('subscribe', self._canal(farmacia_id)))
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._escutar, name='eventos-redis', daemon=True)
+            self._thread.start()
+
+    def _fechar_canal(self, farmacia_id):
+        self._comandos.put(('unsubscribe', self._canal(farmacia_id)))
+
+    def _escutar(self):
+        while True:
+            pubsub = self.cliente.pubsub(ignore_subscribe_messages=True)
+            try:
+                # Após uma reconexão, volta a assinar os canais que ainda têm conexões locais
+                with self._lock:
+                    canais = [self._canal(farmacia_id) for farmacia_id in self._canais]
+                if canais:
+                    pubsub.subscribe(*canais)
+                while True:
+                    while True:
+                        try:
+                            comando, canal = self._comandos.get_nowait()
+                        except queue.Empty:
+                            break
+                        getattr(pubsub, comando)(canal)
+                    mensagem = pubsub.get_message(timeout=self.ESPERA)
+                    if mensagem and mensagem['type'] == 'message':
+                        canal = mensagem['channel']
+                        canal = canal.decode() if isinstance(canal, bytes) else canal
+                        dados = mensagem['data']
+                        self._distribuir(int(canal[len(self.PREFIXO):]),
+                                         dados.decode() if isinstance(dados, bytes) else dados)
+            except Exception:
+                logger.exception('Conexão com o Redis (eventos) perdida; reconectando.')
+                time.sleep(self.RECONEXAO)
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'EVENT_BROKER', 'api.events.InProcessBroker'))()
+    return _broker
+
+
+if hasattr(os, 'register_at_fork'):
+    # Threads e conexões do broker não sobrevivem a um fork (preload_app do gunicorn)
+    os.register_at_fork(after_in_child=lambda: globals().update(_broker=None, _broker_lock=threading.Lock()))
+
+
+def publicar(farmacia_id, tipo, dados):
+    """Publica o evento somente depois do commit da transação atual."""
+    if farmacia_id is None:
+        return
+    transaction.on_commit(lambda: get_broker().publicar(farmacia_id, tipo, dados))
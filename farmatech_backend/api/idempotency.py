@@ -0,0 +1,102 @@
+# farmatech_backend/api/idempotency.py
+
+# Suporte ao cabeçalho Idempotency-Key nos POST de criação.
+# A resposta da primeira execução fica guardada por chave e farmácia na tabela
+# ChaveIdempotencia (compartilhada por todos os workers, com TTL); repetições
+# recebem a resposta guardada sem executar a gravação de novo.
+#
+# A linha da chave é inserida na mesma transação da gravação. Uma repetição
+# concorrente, em qualquer worker, fica bloqueada no índice único até a primeira
+# terminar: se ela confirmou, a repetição recebe a resposta guardada; se foi
+# desfeita, a repetição assume a chave e executa. As linhas expiradas são
+# removidas ao reutilizar a chave e pelo comando limpar_idempotencia.
+
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .cache import get_farmacia_id
+from .models import ChaveIdempotencia
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+
+def _ttl():
+    return getattr(settings, 'IDEMPOTENCY_KEY_TTL', 60 * 60 * 24)
+
+
+def limite_de_validade():
+    """Chaves criadas antes deste momento estão expiradas."""
+    return timezone.now() - timedelta(seconds=_ttl())
+
+
+def _fingerprint(request):
+    corpo = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method}:{request.path}:{corpo}'.encode()).hexdigest()
+
+
+def _replay(entrada, fingerprint):
+    if entrada.fingerprint != fingerprint:
+        return Response(
+            {'detail': 'Idempotency-Key já utilizada com outro conteúdo.'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    response = Response(entrada.resposta, status=entrada.status, headers=entrada.headers)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _reivindicar(escopo, chave, fingerprint):
+    # Savepoint próprio: a violação da restrição única não invalida a transação externa
+    with transaction.atomic():
+        return ChaveIdempotencia.objects.create(escopo=escopo, chave=chave, fingerprint=fingerprint)
+
+
+def idempotent(request, execute):
+    """Executa execute() uma única vez por Idempotency-Key e farmácia."""
+    chave = request.headers.get(IDEMPOTENCY_HEADER)
+    if not chave:
+        return execute()
+
+    escopo = str(get_farmacia_id(request.user) or f'user-{request.user.pk}')
+    chave = hashlib.sha256(chave.encode()).hexdigest()
+    fingerprint = _fingerprint(request)
+    registros = ChaveIdempotencia.objects.filter(escopo=escopo, chave=chave)
+
+    limite = limite_de_validade()
+    entrada = registros.filter(criada_em__gte=limite).first()
+    if entrada is not None:
+        return _replay(entrada, fingerprint)
+    registros.filter(criada_em__lt=limite).delete()
+
+    with transaction.atomic():
+        try:
+            registro = _reivindicar(escopo, chave, fingerprint)
+        except IntegrityError:
+            registro = None
+        if registro is not None:
+            response = execute()
+            if response.status_code >= 500:
+                # Erros de servidor não são guardados: uma nova tentativa pode dar certo
+                transaction.set_rollback(True)
+                return response
+            registro.status = response.status_code
+            registro.resposta = response.data
+            registro.headers = {k: v for k, v in response.items() if k == 'Location'}
+            registro.save(update_fields=['status', 'resposta', 'headers'])
+            return response
+
+    # Outra requisição com a mesma chave confirmou primeiro (a inserção esperou por ela)
+    entrada = registros.first()
+    if entrada is None:
+        return Response(
+            {'detail': 'Requisição com esta Idempotency-Key ainda em processamento.'},
+            status=status.HTTP_409_CONFLICT,
+        )
+    return _replay(entrada, fingerprint)
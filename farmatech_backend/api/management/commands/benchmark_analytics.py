@@ -0,0 +1,84 @@
+# farmatech_backend/api/management/commands/benchmark_analytics.py
+
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.analytics import calcular_analytics
+from api.models import Farmacia, Medicamento, Venda, ItemVenda
+
+CATEGORIAS = ['Analgésico', 'Antibiótico', 'Anti-inflamatório', 'Vitaminas', 'Dermatológico', 'Higiene']
+
+
+class Command(BaseCommand):
+    help = 'Popula uma farmácia temporária com muitos dados e mede o endpoint de análises (tudo é desfeito ao final).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--medicamentos', type=int, default=2000)
+        parser.add_argument('--vendas', type=int, default=50000)
+        parser.add_argument('--itens-por-venda', type=int, default=3)
+        parser.add_argument('--iteracoes', type=int, default=5)
+
+    def handle(self, *args, **options):
+        aleatorio = random.Random(42)
+        with transaction.atomic():
+            inicio = time.perf_counter()
+            farmacia = self._popular(aleatorio, options)
+            self.stdout.write(f"Dados gerados em {time.perf_counter() - inicio:.1f} s")
+
+            for categoria in (None, CATEGORIAS[0]):
+                tempos = []
+                for _ in range(options['iteracoes']):
+                    with CaptureQueriesContext(connection) as consultas:
+                        inicio = time.perf_counter()
+                        calcular_analytics(farmacia, categoria=categoria)
+                        tempos.append((time.perf_counter() - inicio) * 1000)
+                self.stdout.write(
+                    f"categoria={categoria or 'todas'}: mediana {statistics.median(tempos):.0f} ms, "
+                    f"máx {max(tempos):.0f} ms, {len(consultas.captured_queries)} consultas"
+                )
+            transaction.set_rollback(True)
+
+    def _popular(self, aleatorio, options):
+        user = User.objects.create_user(username='benchmark-analytics@farmatech.local')
+        farmacia = Farmacia.objects.create(user=user, nome='Benchmark', responsavel='Benchmark', telefone='0')
+
+        medicamentos = Medicamento.objects.bulk_create([
+            Medicamento(
+                farmacia=farmacia, nome=f'Medicamento {i}', quantidade=aleatorio.randint(0, 500),
+                quantidade_minima=aleatorio.randint(0, 20), categoria=aleatorio.choice(CATEGORIAS),
+                preco=Decimal(aleatorio.randint(100, 20000)) / 100,
+                data_vencimento=date.today() + timedelta(days=aleatorio.randint(-30, 720)),
+            )
+            for i in range(options['medicamentos'])
+        ], batch_size=1000)
+
+        # Popularidade em cauda longa, como em uma farmácia real
+        pesos = [1 / (posicao + 1) for posicao in range(len(medicamentos))]
+        vendas = Venda.objects.bulk_create([
+            Venda(farmacia=farmacia, total=Decimal('0'), forma_pagamento='pix')
+            for _ in range(options['vendas'])
+        ], batch_size=1000)
+
+        # 'data' é auto_now_add: espalha as vendas pelo último ano depois da inserção
+        agora = timezone.now()
+        Venda.objects.bulk_update([
+            Venda(id=venda.id, data=agora - timedelta(minutes=aleatorio.randint(0, 60 * 24 * 365)))
+            for venda in vendas
+        ], ['data'], batch_size=1000)
+
+        ItemVenda.objects.bulk_create([
+            ItemVenda(venda=venda, medicamento=medicamento, quantidade=aleatorio.randint(1, 5),
+                      preco_unitario=medicamento.preco)
+            for venda in vendas
+            for medicamento in aleatorio.choices(medicamentos, weights=pesos, k=options['itens_por_venda'])
+        ], batch_size=1000)
+        return farmacia
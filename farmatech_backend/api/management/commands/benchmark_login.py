@@ -0,0 +1,61 @@
+# farmatech_backend/api/management/commands/benchmark_login.py
+
+import statistics
+import time
+
+from django.contrib.auth.hashers import make_password, check_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+
+from api.models import Farmacia
+from api.views import login_view
+
+
+class Command(BaseCommand):
+    help = 'Mede a latência do login_view comparada a uma única verificação de senha (PBKDF2).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iteracoes', type=int, default=20)
+
+    def handle(self, *args, **options):
+        iteracoes = options['iteracoes']
+        email, senha = 'benchmark-login@farmatech.local', 'benchmark-senha-123'
+        factory = APIRequestFactory()
+
+        # Tudo dentro de uma transação desfeita ao final: nada fica no banco
+        with transaction.atomic():
+            user = User.objects.create_user(username=email, email=email, password=senha)
+            Farmacia.objects.create(user=user, nome='Benchmark', responsavel='Benchmark', telefone='0')
+
+            hash_senha = make_password(senha)
+            referencia = self._medir(iteracoes, lambda: check_password(senha, hash_senha))
+
+            def login():
+                response = login_view(factory.post('/api/login/', {'username': email, 'password': senha}, format='json'))
+                assert response.status_code == 200, response.data
+
+            latencias = self._medir(iteracoes, login)
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"check_password: mediana {statistics.median(referencia):.1f} ms")
+        self.stdout.write(
+            f"login_view:     mediana {statistics.median(latencias):.1f} ms, "
+            f"p95 {self._p95(latencias):.1f} ms, máx {max(latencias):.1f} ms"
+        )
+        self.stdout.write(
+            f"Hashes por login (aprox.): {statistics.median(latencias) / statistics.median(referencia):.2f}"
+        )
+
+    def _medir(self, iteracoes, func):
+        tempos = []
+        for _ in range(iteracoes):
+            inicio = time.perf_counter()
+            func()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        return tempos
+
+    def _p95(self, tempos):
+        ordenados = sorted(tempos)
+        return ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.95))]
@@ -0,0 +1,59 @@
+# farmatech_backend/api/management/commands/benchmark_startup.py
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+# Cada cenário roda em um interpretador novo, como um worker do gunicorn subindo
+CENARIOS = {
+    'api (workers)': 'import api.urls',
+    'api + SDK do Gemini': 'import api.urls; import google.generativeai',
+}
+
+CODIGO_FILHO = """
+import json, resource, time
+inicio = time.perf_counter()
+import django
+django.setup()
+{importacoes}
+print(json.dumps({{
+    'segundos': time.perf_counter() - inicio,
+    'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}}))
+"""
+
+
+class Command(BaseCommand):
+    help = 'Mede o tempo de inicialização e o RSS de um processo que carrega a API, com e sem o SDK de IA.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iteracoes', type=int, default=5)
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+        for nome, importacoes in CENARIOS.items():
+            totais, setups, rss = [], [], []
+            for _ in range(options['iteracoes']):
+                inicio = time.perf_counter()
+                resultado = subprocess.run(
+                    [sys.executable, '-c', CODIGO_FILHO.format(importacoes=importacoes)],
+                    capture_output=True, text=True, env=env,
+                )
+                totais.append(time.perf_counter() - inicio)
+                if resultado.returncode != 0:
+                    self.stdout.write(f"{nome}: falhou ({resultado.stderr.strip().splitlines()[-1]})")
+                    break
+                medida = json.loads(resultado.stdout.strip().splitlines()[-1])
+                setups.append(medida['segundos'])
+                rss.append(medida['rss_kb'])
+            else:
+                self.stdout.write(
+                    f"{nome}: processo {statistics.median(totais) * 1000:.0f} ms, "
+                    f"django.setup + imports {statistics.median(setups) * 1000:.0f} ms, "
+                    f"RSS máx. {statistics.median(rss) / 1024:.1f} MB"
+                )
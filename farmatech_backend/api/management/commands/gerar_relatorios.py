@@ -0,0 +1,101 @@
+# farmatech_backend/api/management/commands/gerar_relatorios.py
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from api.models import Farmacia
+from api.reports import gerar_relatorio, ja_gerado, mes_anterior, periodo_do_mes
+
+
+def _inicializar_worker():
+    # Com fork, o worker herdaria as conexões do processo pai: cada worker abre a sua
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def _gerar(farmacia_id, mes, saida):
+    try:
+        return gerar_relatorio(farmacia_id, mes, saida)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Gera os relatórios mensais (CSV e JSON) de todas ou de algumas farmácias, em paralelo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mes', default=None, help="Mês no formato AAAA-MM (padrão: mês anterior).")
+        parser.add_argument('--farmacias', type=int, nargs='*', help='Ids das farmácias (padrão: todas).')
+        parser.add_argument('--saida', default='relatorios', help='Pasta de saída.')
+        parser.add_argument('--processos', type=int, default=os.cpu_count() or 1,
+                            help='Número de processos; 1 gera tudo no próprio processo.')
+        parser.add_argument('--refazer', action='store_true',
+                            help='Gera de novo farmácias já concluídas (por padrão a execução é retomada).')
+
+    def handle(self, *args, **options):
+        mes = options['mes'] or mes_anterior()
+        try:
+            periodo_do_mes(mes)
+        except ValueError:
+            raise CommandError('Use --mes no formato AAAA-MM.')
+        saida = options['saida']
+
+        farmacias = Farmacia.objects.order_by('id')
+        if options['farmacias']:
+            farmacias = farmacias.filter(id__in=options['farmacias'])
+        ids = list(farmacias.values_list('id', flat=True))
+        pendentes = [i for i in ids if options['refazer'] or not ja_gerado(saida, mes, i)]
+        self.stdout.write(
+            f"Mês {mes}: {len(ids)} farmácias, {len(ids) - len(pendentes)} já concluídas, {len(pendentes)} a gerar."
+        )
+        if not pendentes:
+            return
+
+        inicio = time.perf_counter()
+        resultados, falhas = [], []
+        processos = max(1, min(options['processos'], len(pendentes)))
+
+        if processos == 1:
+            for farmacia_id in pendentes:
+                try:
+                    self._progresso(gerar_relatorio(farmacia_id, mes, saida), resultados, len(pendentes))
+                except Exception as erro:
+                    self._falha(farmacia_id, erro, falhas)
+        else:
+            # As conexões do processo pai não podem ser usadas nos filhos
+            connections.close_all()
+            contexto = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+            with ProcessPoolExecutor(max_workers=processos, mp_context=contexto, initializer=_inicializar_worker) as pool:
+                futuros = {pool.submit(_gerar, farmacia_id, mes, saida): farmacia_id for farmacia_id in pendentes}
+                for futuro in as_completed(futuros):
+                    try:
+                        self._progresso(futuro.result(), resultados, len(pendentes))
+                    except Exception as erro:
+                        self._falha(futuros[futuro], erro, falhas)
+
+        total = time.perf_counter() - inicio
+        soma = sum(r['segundos'] for r in resultados)
+        self.stdout.write(self.style.SUCCESS(
+            f"Concluído: {len(resultados)} farmácias em {total:.1f} s com {processos} processo(s) "
+            f"(soma dos tempos individuais {soma:.1f} s, média {soma / len(resultados) if resultados else 0:.2f} s)."
+        ))
+        if falhas:
+            raise CommandError(f"{len(falhas)} farmácia(s) com erro: {', '.join(map(str, falhas))}. Rode de novo para retomar.")
+
+    def _progresso(self, resultado, resultados, total):
+        resultados.append(resultado)
+        linhas = resultado['linhas']
+        self.stdout.write(
+            f"[{len(resultados)}/{total}] farmácia {resultado['farmacia_id']}: {resultado['segundos']:.2f} s "
+            f"({linhas['vendas']} vendas, {linhas['movimentos']} movimentos)"
+        )
+
+    def _falha(self, farmacia_id, erro, falhas):
+        falhas.append(farmacia_id)
+        self.stderr.write(f"farmácia {farmacia_id}: erro {erro!r}")
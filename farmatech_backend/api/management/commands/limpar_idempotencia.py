@@ -0,0 +1,14 @@
+# farmatech_backend/api/management/commands/limpar_idempotencia.py
+
+from django.core.management.base import BaseCommand
+
+from api.idempotency import limite_de_validade
+from api.models import ChaveIdempotencia
+
+
+class Command(BaseCommand):
+    help = 'Remove as respostas guardadas de Idempotency-Key mais antigas que IDEMPOTENCY_KEY_TTL (rodar via cron).'
+
+    def handle(self, *args, **options):
+        removidas, _ = ChaveIdempotencia.objects.filter(criada_em__lt=limite_de_validade()).delete()
+        self.stdout.write(self.style.SUCCESS(f'{removidas} chave(s) expirada(s) removida(s).'))
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.13 on 2026-10-19 11:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_farmacia_cep_farmacia_cidade_farmacia_endereco_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venda',
+            name='client_id',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='venda',
+            constraint=models.UniqueConstraint(fields=('farmacia', 'client_id'), name='venda_client_id_unico_por_farmacia'),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Índices das listagens e buscas do admin.
+#
+# As tabelas de movimentos e vendas podem ser grandes e o migrate roda na subida
+# do container: no PostgreSQL os índices são criados com CREATE INDEX
+# CONCURRENTLY, que não bloqueia as gravações durante a construção (por isso a
+# migração não é atômica). Se uma construção concorrente falhar, o PostgreSQL
+# deixa o índice marcado como INVALID: remova-o (DROP INDEX) e rode o migrate de novo.
+#
+# Busca por prefixo ('^nome', '^medicamento__nome', '^user__email'): no
+# PostgreSQL o Django gera UPPER(coluna::text) LIKE UPPER('x%'), que um btree
+# comum na coluna não atende; os índices funcionais usam a mesma expressão com
+# text_pattern_ops. Um deles fica em auth_user (tabela do app auth do Django):
+# é criado aqui, e não no modelo, porque o User não é nosso; por isso também não
+# aparece no estado de migrações do Django e é removido ao desfazer esta migração.
+# Em outros bancos (SQLite nos testes) os índices funcionais não são criados.
+
+from django.db import migrations, models
+
+INDICES_DE_BUSCA = [
+    ('medicamento_nome_upper_idx', 'api_medicamento', 'nome'),
+    ('auth_user_email_upper_idx', 'auth_user', 'email'),
+]
+
+
+class AddIndexConcorrente(migrations.AddIndex):
+    """AddIndex que usa CREATE INDEX CONCURRENTLY no PostgreSQL."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            if schema_editor.connection.vendor == 'postgresql':
+                schema_editor.add_index(model, self.index, concurrently=True)
+            else:
+                schema_editor.add_index(model, self.index)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            if schema_editor.connection.vendor == 'postgresql':
+                schema_editor.remove_index(model, self.index, concurrently=True)
+            else:
+                schema_editor.remove_index(model, self.index)
+
+
+def criar_indices_de_busca(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nome, tabela, coluna in INDICES_DE_BUSCA:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {nome} ON {tabela} (UPPER({coluna}::text) text_pattern_ops)'
+        )
+
+
+def remover_indices_de_busca(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nome, _, _ in INDICES_DE_BUSCA:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {nome}')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('api', '0003_venda_client_id'),
+    ]
+
+    operations = [
+        AddIndexConcorrente(
+            model_name='movimento',
+            index=models.Index(fields=['data'], name='movimento_data_idx'),
+        ),
+        AddIndexConcorrente(
+            model_name='venda',
+            index=models.Index(fields=['data'], name='venda_data_idx'),
+        ),
+        AddIndexConcorrente(
+            model_name='venda',
+            index=models.Index(fields=['client_id'], name='venda_client_id_idx'),
+        ),
+        migrations.RunPython(criar_indices_de_busca, remover_indices_de_busca),
+    ]
@@ -2,6 +2,7 @@
 
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
 
 # Extensão do modelo User para incluir a relação com a Farmacia
 # Um usuário terá uma farmácia, e uma farmácia terá um usuário
@@ -26,6 +27,8 @@ class Medicamento(models.Model):
     categoria = models.CharField(max_length=100)
     preco = models.DecimalField(max_digits=10, decimal_places=2)
     data_vencimento = models.DateField()
+    # A busca por prefixo do admin (UPPER(nome) LIKE 'X%') usa um índice funcional
+    # criado só no PostgreSQL pela migração 0004_indices_admin
 
     def __str__(self):
         return self.nome
@@ -41,8 +44,16 @@ class Movimento(models.Model):
     data = models.DateTimeField(auto_now_add=True)
     observacoes = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['data'], name='movimento_data_idx'), # Ordenação e date_hierarchy no admin
+        ]
+
     def __str__(self):
-        return f"{self.tipo} de {self.quantidade} unidades de {self.medicamento.nome}"
+        # Sem consulta extra quando o medicamento não veio junto (select_related)
+        if Movimento.medicamento.is_cached(self):
+            return f"{self.tipo} de {self.quantidade} unidades de {self.medicamento.nome}"
+        return f"{self.tipo} de {self.quantidade} unidades do medicamento #{self.medicamento_id}"
 
 class Venda(models.Model):
     farmacia = models.ForeignKey(Farmacia, on_delete=models.CASCADE, related_name='vendas')
@@ -55,6 +66,17 @@ class Venda(models.Model):
         ('pix', 'Pix'),
     ]
     forma_pagamento = models.CharField(max_length=20, choices=FORMA_PAGAMENTO_CHOICES)
+    # Id gerado pelo caixa (PDV) para vendas registradas offline e enviadas em lote
+    client_id = models.CharField(max_length=64, blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['farmacia', 'client_id'], name='venda_client_id_unico_por_farmacia'),
+        ]
+        indexes = [
+            models.Index(fields=['data'], name='venda_data_idx'), # Ordenação e date_hierarchy no admin
+            models.Index(fields=['client_id'], name='venda_client_id_idx'), # Busca exata por client_id no admin
+        ]
 
     def __str__(self):
         return f"Venda #{self.id} - Total: R${self.total}"
@@ -67,5 +89,30 @@ class ItemVenda(models.Model):
     preco_unitario = models.DecimalField(max_digits=10, decimal_places=2) # Preço do medicamento no momento da venda
 
     def __str__(self):
-        return f"{self.quantidade}x {self.medicamento.nome} em Venda #{self.venda.id}"
+        if ItemVenda.medicamento.is_cached(self):
+            return f"{self.quantidade}x {self.medicamento.nome} em Venda #{self.venda_id}"
+        return f"{self.quantidade}x medicamento #{self.medicamento_id} em Venda #{self.venda_id}"
+
 
+# Respostas dos POST com Idempotency-Key (ver api/idempotency.py)
+# Fica no banco para valer entre todos os workers: a linha é criada na mesma
+# transação da gravação e a restrição única serializa as requisições repetidas
+class ChaveIdempotencia(models.Model):
+    escopo = models.CharField(max_length=64) # Id da farmácia (ou 'user-<id>' para usuários sem farmácia)
+    chave = models.CharField(max_length=64) # sha256 do cabeçalho Idempotency-Key
+    fingerprint = models.CharField(max_length=64) # sha256 de método, caminho e corpo
+    status = models.PositiveSmallIntegerField(null=True)
+    resposta = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    headers = models.JSONField(default=dict)
+    criada_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['escopo', 'chave'], name='idempotencia_chave_unica_por_escopo'),
+        ]
+        indexes = [
+            models.Index(fields=['criada_em'], name='idempotencia_criada_em_idx'), # Limpeza das expiradas
+        ]
+
+    def __str__(self):
+        return f"{self.escopo}:{self.chave[:12]} ({self.status})"
@@ -0,0 +1,248 @@
+# farmatech_backend/api/prompt_digest.py
+
+# Resumo estatístico dos dados da farmácia para o prompt da análise de IA.
+# Antes o prompt levava uma linha por medicamento, movimento e venda, e crescia
+# sem limite com o tamanho da loja. Aqui tudo vem de consultas agregadas (número
+# fixo de consultas, independente do volume) e o texto respeita um orçamento de
+# tokens: as seções entram por prioridade e, no espaço que sobrar, uma amostra
+# de linhas brutas cujo tamanho se ajusta ao orçamento restante.
+
+import math
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, DecimalField, F, Prefetch, Q, Sum
+from django.db.models.functions import Coalesce, TruncWeek
+from django.utils import timezone
+
+from .analytics import calcular_analytics
+from .models import ItemVenda, Medicamento, Movimento, Venda
+
+# Heurística de tokens: ~4 caracteres por token em português com números
+CARACTERES_POR_TOKEN = 4
+# Tamanho médio (tokens) de uma linha bruta de cada tipo, usado para dimensionar a amostra
+TOKENS_POR_LINHA = {'medicamentos': 40, 'movimentos': 35, 'vendas': 50}
+PARTE_DA_AMOSTRA = {'vendas': 0.4, 'movimentos': 0.3, 'medicamentos': 0.3}
+MOVIMENTADORES = 5
+LIMITE_ANOMALIAS = 15
+
+
+def estimate_tokens(texto):
+    """Estimativa conservadora do número de tokens de um texto."""
+    return math.ceil(len(texto) / CARACTERES_POR_TOKEN)
+
+
+def _reais(valor):
+    return f"R${(valor or Decimal('0')):.2f}"
+
+
+def _custo(linha):
+    return estimate_tokens(linha) + 1 # +1 pela quebra de linha
+
+
+def _omitidos(quantidade):
+    return f"- (+{quantidade} omitidos)"
+
+
+class Orcamento:
+    def __init__(self, limite):
+        self.limite = limite
+        self.usado = 0
+        self.linhas = []
+
+    @property
+    def restante(self):
+        return max(self.limite - self.usado, 0)
+
+    def secao(self, titulo, linhas):
+        """Adiciona o título e as linhas que couberem; retorna quantas linhas entraram.
+
+        Quando nem todas cabem, a linha '- (+N omitidos)' também precisa caber:
+        cada linha só entra se sobrar espaço para o marcador das que vêm depois.
+        """
+        linhas = list(linhas)
+        titulo = f"## {titulo}"
+        disponivel = self.restante - _custo(titulo)
+        incluidas = 0
+        for linha in linhas:
+            depois = len(linhas) - incluidas - 1
+            reserva = _custo(_omitidos(depois)) if depois else 0
+            if _custo(linha) + reserva > disponivel:
+                break
+            disponivel -= _custo(linha)
+            incluidas += 1
+        if not incluidas:
+            return 0
+        self._adicionar(titulo)
+        for linha in linhas[:incluidas]:
+            self._adicionar(linha)
+        if incluidas < len(linhas):
+            self._adicionar(_omitidos(len(linhas) - incluidas))
+        return incluidas
+
+    def _adicionar(self, linha):
+        self.linhas.append(linha)
+        self.usado += _custo(linha)
+
+    def texto(self):
+        return '\n'.join(self.linhas)
+
+
+def _totais(farmacia, hoje):
+    medicamentos = Medicamento.objects.filter(farmacia=farmacia)
+    valor = DecimalField(max_digits=14, decimal_places=2)
+    estoque = medicamentos.aggregate(
+        itens=Count('id'),
+        unidades=Coalesce(Sum('quantidade'), 0),
+        valor_estoque=Coalesce(Sum(F('quantidade') * F('preco'), output_field=valor), Decimal('0'), output_field=valor),
+        negativos=Count('id', filter=Q(quantidade__lt=0)),
+        abaixo_minimo=Count('id', filter=Q(quantidade__lte=F('quantidade_minima'))),
+        vencidos=Count('id', filter=Q(data_vencimento__lt=hoje)),
+        vence_30=Count('id', filter=Q(data_vencimento__gte=hoje, data_vencimento__lte=hoje + timedelta(days=30))),
+        vence_60=Count('id', filter=Q(data_vencimento__gt=hoje + timedelta(days=30), data_vencimento__lte=hoje + timedelta(days=60))),
+        vence_90=Count('id', filter=Q(data_vencimento__gt=hoje + timedelta(days=60), data_vencimento__lte=hoje + timedelta(days=90))),
+        vence_depois=Count('id', filter=Q(data_vencimento__gt=hoje + timedelta(days=90))),
+        unidades_vencidas=Coalesce(Sum('quantidade', filter=Q(data_vencimento__lt=hoje)), 0),
+    )
+    movimentos = Movimento.objects.filter(medicamento__farmacia=farmacia).aggregate(
+        total_entradas=Coalesce(Sum('quantidade', filter=Q(tipo='entrada')), 0),
+        total_saidas=Coalesce(Sum('quantidade', filter=Q(tipo='saida')), 0),
+        total_movimentos=Count('id'),
+    )
+    vendas = Venda.objects.filter(farmacia=farmacia).aggregate(
+        total_vendas=Count('id'),
+        total_vendas_valor=Coalesce(Sum('total'), Decimal('0'), output_field=valor),
+    )
+    return estoque, movimentos, vendas
+
+
+def _tendencias(farmacia, inicio):
+    semanas = {}
+    for linha in (Venda.objects.filter(farmacia=farmacia, data__gte=inicio)
+                  .annotate(semana=TruncWeek('data')).values('semana')
+                  .annotate(vendas=Count('id'), receita=Sum('total')).order_by('semana')):
+        semanas.setdefault(linha['semana'].date(), {}).update(vendas=linha['vendas'], receita=linha['receita'])
+    for linha in (Movimento.objects.filter(medicamento__farmacia=farmacia, data__gte=inicio)
+                  .annotate(semana=TruncWeek('data')).values('semana')
+                  .annotate(entradas=Coalesce(Sum('quantidade', filter=Q(tipo='entrada')), 0),
+                            saidas=Coalesce(Sum('quantidade', filter=Q(tipo='saida')), 0))
+                  .order_by('semana')):
+        semanas.setdefault(linha['semana'].date(), {}).update(entradas=linha['entradas'], saidas=linha['saidas'])
+
+    linhas = []
+    receita_anterior = None
+    for semana in sorted(semanas):
+        dados = semanas[semana]
+        receita = dados.get('receita') or Decimal('0')
+        variacao = ''
+        if receita_anterior:
+            variacao = f" ({(receita - receita_anterior) / receita_anterior * 100:+.0f}% vs semana anterior)"
+        linhas.append(
+            f"- Semana de {semana}: {dados.get('vendas', 0)} vendas, {_reais(receita)}{variacao}; "
+            f"entradas {dados.get('entradas', 0)} un, saídas {dados.get('saidas', 0)} un"
+        )
+        receita_anterior = receita
+    return linhas
+
+
+def _amostra(orcamento, farmacia):
+    """Linhas brutas mais relevantes, em quantidade proporcional ao orçamento restante."""
+    restante = orcamento.restante
+    quantidade = {tipo: int(restante * parte) // TOKENS_POR_LINHA[tipo] for tipo, parte in PARTE_DA_AMOSTRA.items()}
+
+    if quantidade['vendas']:
+        vendas = (Venda.objects.filter(farmacia=farmacia).order_by('-data')
+                  .prefetch_related(Prefetch('itens', ItemVenda.objects.select_related('medicamento')))[:quantidade['vendas']])
+        orcamento.secao('Amostra: vendas mais recentes', [
+            f"- Venda ID: {venda.id}, Total: R${venda.total:.2f}, Data: {venda.data.strftime('%Y-%m-%d %H:%M')}, "
+            f"Forma Pagamento: {venda.forma_pagamento}, Itens: "
+            + (', '.join(f"{item.quantidade}x {item.medicamento.nome} (R${item.preco_unitario:.2f}/unid)"
+                         for item in venda.itens.all()) or 'N/A')
+            for venda in vendas
+        ])
+    if quantidade['movimentos']:
+        movimentos = (Movimento.objects.filter(medicamento__farmacia=farmacia).order_by('-data')
+                      .select_related('medicamento')[:quantidade['movimentos']])
+        orcamento.secao('Amostra: movimentações mais recentes', [
+            f"- Medicamento: {mov.medicamento.nome}, Tipo: {mov.tipo}, Qtd: {mov.quantidade}, "
+            f"Data: {mov.data.strftime('%Y-%m-%d %H:%M')}, Obs: {mov.observacoes or 'N/A'}"
+            for mov in movimentos
+        ])
+    if quantidade['medicamentos']:
+        # Os que mais pedem atenção primeiro: estoque mais perto (ou abaixo) do mínimo, vencimento mais próximo
+        medicamentos = (Medicamento.objects.filter(farmacia=farmacia)
+                        .annotate(folga=F('quantidade') - F('quantidade_minima'))
+                        .order_by('folga', 'data_vencimento')[:quantidade['medicamentos']])
+        orcamento.secao('Amostra: medicamentos', [
+            f"- Nome: {med.nome}, Estoque: {med.quantidade}, Mínimo: {med.quantidade_minima}, Categoria: {med.categoria}, "
+            f"Preço: R${med.preco:.2f}, Vencimento: {med.data_vencimento}"
+            for med in medicamentos
+        ])
+
+
+def build_digest(farmacia, budget_tokens=None, dias=90):
+    """Monta o resumo da farmácia para o prompt; retorna (texto, totais)."""
+    if budget_tokens is None:
+        budget_tokens = getattr(settings, 'AI_PROMPT_TOKEN_BUDGET', 6000)
+    agora = timezone.now()
+    hoje = timezone.localdate()
+    estoque, movimentos, vendas = _totais(farmacia, hoje)
+    analise = calcular_analytics(farmacia, dias=dias)
+    orcamento = Orcamento(budget_tokens)
+
+    orcamento.secao('Visão geral', [
+        f"- Medicamentos cadastrados: {estoque['itens']}; unidades em estoque: {estoque['unidades']}; "
+        f"valor do estoque: {_reais(estoque['valor_estoque'])}",
+        f"- Vendas (histórico): {vendas['total_vendas']} vendas, {_reais(vendas['total_vendas_valor'])}",
+        f"- Movimentações (histórico): {movimentos['total_movimentos']}; entradas {movimentos['total_entradas']} un, "
+        f"saídas {movimentos['total_saidas']} un",
+        f"- Curva ABC (receita dos últimos {dias} dias): "
+        + '; '.join(f"{classe}: {dados['itens']} itens, R${dados['receita']}" for classe, dados in analise['resumo_abc'].items()),
+    ])
+
+    anomalias = []
+    if estoque['negativos']:
+        anomalias.append(f"- {estoque['negativos']} medicamento(s) com estoque NEGATIVO")
+    if estoque['abaixo_minimo']:
+        anomalias.append(f"- {estoque['abaixo_minimo']} medicamento(s) no estoque mínimo ou abaixo")
+    if estoque['vencidos']:
+        anomalias.append(f"- {estoque['vencidos']} medicamento(s) vencidos ainda com {estoque['unidades_vencidas']} un em estoque")
+    criticos = (Medicamento.objects.filter(farmacia=farmacia, quantidade__lte=F('quantidade_minima'))
+                .order_by(F('quantidade') - F('quantidade_minima'))
+                .values_list('nome', 'quantidade', 'quantidade_minima')[:LIMITE_ANOMALIAS])
+    anomalias += [f"  - {nome}: estoque {quantidade} (mínimo {minimo})" for nome, quantidade, minimo in criticos]
+    if analise['estoque_parado']:
+        anomalias.append(f"- {len(analise['estoque_parado'])} medicamento(s) sem venda há mais de "
+                         f"{analise['periodo']['dias_sem_venda']} dias")
+    orcamento.secao('Alertas e anomalias', anomalias)
+
+    orcamento.secao('Vencimentos', [
+        f"- Vencidos: {estoque['vencidos']}; até 30 dias: {estoque['vence_30']}; 31-60 dias: {estoque['vence_60']}; "
+        f"61-90 dias: {estoque['vence_90']}; mais de 90 dias: {estoque['vence_depois']}",
+    ])
+
+    orcamento.secao('Estoque por categoria', [
+        f"- {linha['categoria']}: {linha['itens']} itens, {linha['unidades']} un, R${linha['valor_estoque']}"
+        for linha in analise['valor_estoque_por_categoria']
+    ])
+
+    orcamento.secao(f"Tendência semanal (últimos {dias} dias)", _tendencias(farmacia, agora - timedelta(days=dias)))
+
+    por_unidades = sorted(analise['abc'], key=lambda linha: (-linha['unidades_vendidas'], linha['nome']))
+    def movimentador(linha):
+        return (f"- {linha['nome']} ({linha['categoria']}): {linha['unidades_vendidas']} un vendidas, "
+                f"R${linha['receita']}, estoque {linha['estoque_atual']}, sell-through {linha['sell_through']:.0%}")
+    orcamento.secao(f"Mais vendidos (últimos {dias} dias)", [movimentador(l) for l in por_unidades[:MOVIMENTADORES]])
+    orcamento.secao(f"Menos vendidos (últimos {dias} dias)",
+                    [movimentador(l) for l in por_unidades[MOVIMENTADORES:][-MOVIMENTADORES:][::-1]])
+
+    _amostra(orcamento, farmacia)
+
+    totais = {
+        'total_entradas': movimentos['total_entradas'],
+        'total_saidas': movimentos['total_saidas'],
+        'total_vendas_valor': vendas['total_vendas_valor'],
+        'medicamentos_em_estoque': estoque['unidades'],
+    }
+    return orcamento.texto(), totais
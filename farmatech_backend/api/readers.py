@@ -0,0 +1,94 @@
+# farmatech_backend/api/readers.py
+
+# Caminho de leitura enxuto para listagens grandes.
+# O ModelSerializer instancia campos e chama to_representation campo a campo
+# para cada linha; aqui o serializer é "compilado" uma única vez em uma lista
+# de colunas para .values() e transformadores por coluna, produzindo
+# exatamente a mesma saída (mesmas chaves, mesma ordem, mesmos tipos).
+
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+
+# Campos cujo valor vindo do banco já é a própria representação
+PASSTHROUGH_FIELDS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    PrimaryKeyRelatedField,
+)
+
+
+class FastReader:
+    """Leitor pré-compilado para um ModelSerializer somente leitura."""
+
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        self.model = serializer.Meta.model
+        self.columns = []    # colunas pedidas ao .values()
+        self.fields = []     # (chave de saída, coluna, transformador ou None)
+        self.nested = []     # (chave de saída, FastReader filho, coluna de ligação)
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.ListSerializer):
+                related = self.model._meta.get_field(field.source)
+                child = FastReader(type(field.child))
+                self.nested.append((name, child, related.field.name))
+                self.fields.append((name, None, None))
+                continue
+            if isinstance(field, serializers.BaseSerializer):
+                raise TypeError(f"Campo aninhado não suportado no caminho rápido: {name}")
+
+            column = '__'.join(field.source_attrs)
+            transform = None if isinstance(field, PASSTHROUGH_FIELDS) else field.to_representation
+            self.columns.append(column)
+            self.fields.append((name, column, transform))
+
+        if self.nested and 'id' not in self.columns:
+            self.columns.append('id')
+
+    def _build(self, row, children):
+        data = {}
+        for name, column, transform in self.fields:
+            if column is None:
+                data[name] = children[name].get(row['id'], [])
+                continue
+            value = row[column]
+            if value is None or transform is None:
+                data[name] = value
+            else:
+                data[name] = transform(value)
+        return data
+
+    def _children(self, queryset):
+        children = {}
+        for name, child, link in self.nested:
+            link_column = f'{link}_id'
+            columns = child.columns if link_column in child.columns else child.columns + [link_column]
+            child_queryset = child.model.objects.filter(**{f'{link}__in': queryset.values('pk')})
+            grandchildren = child._children(child_queryset) if child.nested else {}
+            grouped = {}
+            for row in child_queryset.values(*columns):
+                grouped.setdefault(row[link_column], []).append(child._build(row, grandchildren))
+            children[name] = grouped
+        return children
+
+    def read(self, queryset):
+        """Retorna a lista de dicionários equivalente a Serializer(queryset, many=True).data."""
+        rows = list(queryset.values(*self.columns))
+        if not rows:
+            return []
+        children = self._children(queryset)
+        return [self._build(row, children) for row in rows]
+
+
+_readers = {}
+
+
+def get_reader(serializer_class):
+    # Compila o leitor apenas na primeira vez para cada serializer
+    reader = _readers.get(serializer_class)
+    if reader is None:
+        reader = _readers[serializer_class] = FastReader(serializer_class)
+    return reader
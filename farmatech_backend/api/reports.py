@@ -0,0 +1,131 @@
+# farmatech_backend/api/reports.py
+
+# Relatórios mensais por farmácia (mesma intenção de database/queries.sql):
+# resumo de vendas, mais vendidos, movimentações, vendas do mês, estoque baixo
+# e medicamentos a vencer. As listas longas são lidas com .iterator() (cursor no
+# servidor no PostgreSQL) e gravadas em CSV linha a linha; os arquivos são
+# escritos com nome temporário e renomeados no fim, e o marcador concluido.json
+# indica que a farmácia já está pronta (usado para retomar uma execução).
+
+import csv
+import json
+import os
+import time
+from datetime import date, datetime, time as dtime, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Avg, Count, F, Sum
+from django.utils import timezone
+
+from .models import Farmacia, Medicamento, Movimento, Venda, ItemVenda
+
+CHUNK = 2000
+DIAS_VENCIMENTO = 30
+MARCADOR = 'concluido.json'
+
+
+def periodo_do_mes(mes):
+    """Início (inclusive) e fim (exclusivo) do mês 'AAAA-MM', no fuso do projeto."""
+    inicio = datetime.strptime(mes, '%Y-%m').date()
+    fim = (inicio.replace(day=28) + timedelta(days=4)).replace(day=1)
+    tz = timezone.get_current_timezone()
+    return (timezone.make_aware(datetime.combine(inicio, dtime.min), tz),
+            timezone.make_aware(datetime.combine(fim, dtime.min), tz))
+
+
+def pasta_da_farmacia(saida, mes, farmacia_id):
+    return os.path.join(saida, mes, f'farmacia_{farmacia_id}')
+
+
+def ja_gerado(saida, mes, farmacia_id):
+    return os.path.exists(os.path.join(pasta_da_farmacia(saida, mes, farmacia_id), MARCADOR))
+
+
+def _gravar_csv(pasta, nome, cabecalho, linhas):
+    caminho = os.path.join(pasta, nome)
+    total = 0
+    with open(caminho + '.tmp', 'w', newline='', encoding='utf-8') as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(cabecalho)
+        for linha in linhas:
+            escritor.writerow(linha)
+            total += 1
+    os.replace(caminho + '.tmp', caminho)
+    return total
+
+
+def _gravar_json(pasta, nome, dados):
+    caminho = os.path.join(pasta, nome)
+    with open(caminho + '.tmp', 'w', encoding='utf-8') as arquivo:
+        json.dump(dados, arquivo, cls=DjangoJSONEncoder, ensure_ascii=False, indent=2)
+    os.replace(caminho + '.tmp', caminho)
+
+
+def gerar_relatorio(farmacia_id, mes, saida):
+    """Gera os relatórios de uma farmácia e retorna as contagens e o tempo gasto."""
+    inicio_execucao = time.perf_counter()
+    inicio, fim = periodo_do_mes(mes)
+    farmacia = Farmacia.objects.only('id', 'nome').get(pk=farmacia_id)
+    pasta = pasta_da_farmacia(saida, mes, farmacia_id)
+    os.makedirs(pasta, exist_ok=True)
+
+    vendas = Venda.objects.filter(farmacia_id=farmacia_id, data__gte=inicio, data__lt=fim)
+    itens = ItemVenda.objects.filter(venda__in=vendas)
+
+    resumo = vendas.aggregate(total_vendas=Count('id'), receita_total=Sum('total'), ticket_medio=Avg('total'))
+    por_pagamento = list(
+        vendas.values('forma_pagamento').annotate(vendas=Count('id'), receita=Sum('total')).order_by('-receita')
+    )
+    mais_vendidos = list(
+        itens.values('medicamento_id', nome=F('medicamento__nome'))
+        .annotate(total_vendido=Sum('quantidade'), receita_total=Sum(F('quantidade') * F('preco_unitario')))
+        .order_by('-total_vendido')[:10]
+    )
+
+    contagens = {}
+    contagens['vendas'] = _gravar_csv(
+        pasta, 'vendas.csv', ['venda_id', 'data', 'forma_pagamento', 'total', 'total_itens'],
+        vendas.annotate(total_itens=Count('itens')).order_by('data')
+        .values_list('id', 'data', 'forma_pagamento', 'total', 'total_itens').iterator(chunk_size=CHUNK),
+    )
+    contagens['movimentos'] = _gravar_csv(
+        pasta, 'movimentos.csv', ['movimento_id', 'data', 'medicamento', 'tipo', 'quantidade', 'observacoes'],
+        Movimento.objects.filter(medicamento__farmacia_id=farmacia_id, data__gte=inicio, data__lt=fim)
+        .order_by('data').values_list('id', 'data', 'medicamento__nome', 'tipo', 'quantidade', 'observacoes')
+        .iterator(chunk_size=CHUNK),
+    )
+
+    medicamentos = Medicamento.objects.filter(farmacia_id=farmacia_id)
+    fim_do_mes = (fim - timedelta(days=1)).date()
+    contagens['a_vencer'] = _gravar_csv(
+        pasta, 'a_vencer.csv', ['medicamento', 'data_vencimento', 'quantidade', 'dias_para_vencer'],
+        (
+            (nome, vencimento, quantidade, (vencimento - fim_do_mes).days)
+            for nome, vencimento, quantidade in medicamentos
+            .filter(data_vencimento__gt=fim_do_mes, data_vencimento__lte=fim_do_mes + timedelta(days=DIAS_VENCIMENTO))
+            .order_by('data_vencimento').values_list('nome', 'data_vencimento', 'quantidade').iterator(chunk_size=CHUNK)
+        ),
+    )
+    contagens['estoque_baixo'] = _gravar_csv(
+        pasta, 'estoque_baixo.csv', ['medicamento', 'categoria', 'quantidade', 'quantidade_minima'],
+        medicamentos.filter(quantidade__lte=F('quantidade_minima')).order_by('nome')
+        .values_list('nome', 'categoria', 'quantidade', 'quantidade_minima').iterator(chunk_size=CHUNK),
+    )
+
+    segundos = round(time.perf_counter() - inicio_execucao, 3)
+    _gravar_json(pasta, 'resumo.json', {
+        'farmacia': {'id': farmacia.id, 'nome': farmacia.nome},
+        'mes': mes,
+        'resumo_vendas': resumo,
+        'vendas_por_forma_pagamento': por_pagamento,
+        'mais_vendidos': mais_vendidos,
+        'linhas': contagens,
+    })
+    # O marcador é o último arquivo: sem ele a farmácia é refeita na próxima execução
+    _gravar_json(pasta, MARCADOR, {'gerado_em': timezone.now(), 'segundos': segundos, 'linhas': contagens})
+    return {'farmacia_id': farmacia_id, 'segundos': segundos, 'linhas': contagens}
+
+
+def mes_anterior(hoje=None):
+    hoje = hoje or date.today()
+    return (hoje.replace(day=1) - timedelta(days=1)).strftime('%Y-%m')
@@ -1,8 +1,16 @@
 # api/serializers.py
 
+from collections import defaultdict
+from datetime import timedelta
+
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
 from .models import Farmacia, Medicamento, Movimento, Venda, ItemVenda # NOVO: Importar ItemVenda
+from .cache import invalidate_catalog
+from .events import publicar
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -46,6 +54,13 @@ class MovimentoSerializer(serializers.ModelSerializer):
         medicamento.save()
 
         movimento = Movimento.objects.create(**validated_data)
+        publicar(medicamento.farmacia_id, 'movimento', {
+            'id': movimento.id,
+            'medicamento': medicamento.id,
+            'tipo': tipo,
+            'quantidade': quantidade,
+            'estoque': medicamento.quantidade,
+        })
         return movimento
 
 # NOVO: Serializer para Item de Venda (para lidar com a lista de medicamentos em uma venda)
@@ -89,9 +104,154 @@ class VendaSerializer(serializers.ModelSerializer):
             medicamento.save()
 
             ItemVenda.objects.create(venda=venda, **item_data)
-        
+
+        publicar(farmacia.id, 'venda', {
+            'id': venda.id,
+            'total': venda.total,
+            'forma_pagamento': venda.forma_pagamento,
+            'itens': [{'medicamento': item['medicamento'].id, 'quantidade': item['quantidade']} for item in itens_data],
+            'estoque': {item['medicamento'].id: item['medicamento'].quantidade for item in itens_data},
+        })
         return venda
 
+# Vendas registradas offline pelos caixas e enviadas em lote
+class ItemVendaOfflineSerializer(serializers.Serializer):
+    medicamento = serializers.IntegerField() # Id simples: os medicamentos são buscados de uma vez para o lote todo
+    quantidade = serializers.IntegerField(min_value=1)
+    preco_unitario = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+# Diferença tolerada entre o relógio do caixa e o do servidor
+TOLERANCIA_RELOGIO = timedelta(minutes=5)
+
+class VendaOfflineSerializer(serializers.Serializer):
+    client_id = serializers.CharField(max_length=64)
+    forma_pagamento = serializers.ChoiceField(choices=Venda.FORMA_PAGAMENTO_CHOICES)
+    itens = ItemVendaOfflineSerializer(many=True, allow_empty=False)
+    # Momento da venda no caixa; sem ela, vale o momento do envio
+    data = serializers.DateTimeField(required=False)
+
+    def validate_data(self, value):
+        agora = timezone.now()
+        if value > agora + TOLERANCIA_RELOGIO:
+            raise serializers.ValidationError("A data da venda não pode estar no futuro.")
+        dias = getattr(settings, 'VENDAS_LOTE_DATA_MAX_DIAS', 30)
+        if value < agora - timedelta(days=dias):
+            raise serializers.ValidationError(f"A data da venda não pode ter mais de {dias} dias.")
+        return min(value, agora)
+
+class VendaLoteSerializer(serializers.Serializer):
+    vendas = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+    def validate_vendas(self, value):
+        limite = getattr(settings, 'VENDAS_LOTE_MAX', 1000)
+        if len(value) > limite:
+            raise serializers.ValidationError(f"O lote pode ter no máximo {limite} vendas.")
+        return value
+
+    def create(self, validated_data):
+        farmacia = self.context['request'].user.farmacia
+        resultados = []
+        validas = []
+        vistos = set()
+
+        for dados in validated_data['vendas']:
+            venda_serializer = VendaOfflineSerializer(data=dados)
+            if not venda_serializer.is_valid():
+                resultados.append({'client_id': dados.get('client_id'), 'status': 'rejeitada', 'venda_id': None,
+                                   'motivo': venda_serializer.errors})
+                continue
+            venda = venda_serializer.validated_data
+            resultado = {'client_id': venda['client_id'], 'status': None, 'venda_id': None, 'motivo': None}
+            if venda['client_id'] in vistos:
+                resultado.update(status='rejeitada', motivo='client_id repetido no lote.')
+            else:
+                vistos.add(venda['client_id'])
+                validas.append((resultado, venda))
+            resultados.append(resultado)
+
+        with transaction.atomic():
+            # Vendas já recebidas em um envio anterior (o caixa reenviou o lote)
+            existentes = dict(
+                Venda.objects.filter(farmacia=farmacia, client_id__in=vistos).values_list('client_id', 'id')
+            )
+            ids_medicamentos = {item['medicamento'] for _, venda in validas for item in venda['itens']}
+            # Trava as linhas de estoque envolvidas até o fim da transação
+            medicamentos = Medicamento.objects.select_for_update().filter(farmacia=farmacia).in_bulk(ids_medicamentos)
+
+            estoque = {pk: medicamento.quantidade for pk, medicamento in medicamentos.items()}
+            aceitas = []
+            for resultado, venda in validas:
+                if venda['client_id'] in existentes:
+                    resultado.update(status='duplicada', venda_id=existentes[venda['client_id']])
+                    continue
+
+                saida = defaultdict(int)
+                for item in venda['itens']:
+                    saida[item['medicamento']] += item['quantidade']
+                motivo = None
+                for medicamento_id, quantidade in saida.items():
+                    if medicamento_id not in medicamentos:
+                        motivo = f"Medicamento {medicamento_id} não encontrado."
+                    elif estoque[medicamento_id] < quantidade:
+                        motivo = f"Quantidade insuficiente em estoque para {medicamentos[medicamento_id].nome}."
+                    if motivo:
+                        break
+                if motivo:
+                    resultado.update(status='rejeitada', motivo=motivo)
+                    continue
+
+                for medicamento_id, quantidade in saida.items():
+                    estoque[medicamento_id] -= quantidade
+                aceitas.append((resultado, venda))
+
+            vendas = Venda.objects.bulk_create([
+                Venda(
+                    farmacia=farmacia,
+                    client_id=venda['client_id'],
+                    forma_pagamento=venda['forma_pagamento'],
+                    total=sum(item['quantidade'] * item['preco_unitario'] for item in venda['itens']),
+                )
+                for _, venda in aceitas
+            ])
+            ItemVenda.objects.bulk_create([
+                ItemVenda(venda=obj, medicamento_id=item['medicamento'], quantidade=item['quantidade'],
+                          preco_unitario=item['preco_unitario'])
+                for obj, (_, venda) in zip(vendas, aceitas)
+                for item in venda['itens']
+            ])
+            # auto_now_add ignora o valor informado no INSERT: a data do caixa é gravada em seguida
+            datadas = []
+            for obj, (_, venda) in zip(vendas, aceitas):
+                if 'data' in venda:
+                    obj.data = venda['data']
+                    datadas.append(obj)
+            Venda.objects.bulk_update(datadas, ['data'])
+
+            # Uma única atualização de estoque por medicamento para o lote inteiro
+            alterados = []
+            for pk, medicamento in medicamentos.items():
+                if medicamento.quantidade != estoque[pk]:
+                    medicamento.quantidade = estoque[pk]
+                    alterados.append(medicamento)
+            Medicamento.objects.bulk_update(alterados, ['quantidade'])
+            if alterados:
+                invalidate_catalog(farmacia.id)
+            if vendas:
+                publicar(farmacia.id, 'vendas_lote', {
+                    'vendas': [obj.id for obj in vendas],
+                    'estoque': {medicamento.id: medicamento.quantidade for medicamento in alterados},
+                })
+
+        for obj, (resultado, _) in zip(vendas, aceitas):
+            resultado.update(status='aceita', venda_id=obj.id)
+        return resultados
+
+# Parâmetros de consulta do endpoint de análises (GET /api/analytics/)
+class AnalyticsParamsSerializer(serializers.Serializer):
+    dias = serializers.IntegerField(min_value=1, max_value=3650, default=90)
+    dias_sem_venda = serializers.IntegerField(min_value=1, max_value=3650, default=60)
+    categoria = serializers.CharField(max_length=100, required=False)
+
 class RegisterSerializer(serializers.Serializer):
     email = serializers.EmailField()
     senha = serializers.CharField(write_only=True)
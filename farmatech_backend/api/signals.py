@@ -0,0 +1,42 @@
+# farmatech_backend/api/signals.py
+
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from .cache import invalidate_catalog, invalidate_farmacia, forget_farmacia_id
+from .models import Farmacia, Medicamento
+
+
+@receiver([post_save, post_delete], sender=Medicamento)
+def medicamento_alterado(sender, instance, **kwargs):
+    invalidate_catalog(instance.farmacia_id)
+
+
+@receiver(pre_save, sender=Farmacia)
+def farmacia_vai_ser_salva(sender, instance, **kwargs):
+    # A farmácia pode trocar de dono (admin): o dono anterior também precisa
+    # esquecer o id em cache, senão continuaria vendo os dados dela
+    instance._user_id_anterior = None
+    if instance.pk is not None:
+        instance._user_id_anterior = (
+            Farmacia.objects.filter(pk=instance.pk).values_list('user_id', flat=True).first()
+        )
+
+
+@receiver([post_save, post_delete], sender=Farmacia)
+def farmacia_alterada(sender, instance, **kwargs):
+    forget_farmacia_id(instance.user_id)
+    anterior = getattr(instance, '_user_id_anterior', None)
+    if anterior is not None and anterior != instance.user_id:
+        forget_farmacia_id(anterior)
+    invalidate_farmacia(instance.id)
+
+
+@receiver(post_save, sender=User)
+def usuario_alterado(sender, instance, created, **kwargs):
+    # O perfil da farmácia inclui username/email do usuário
+    if created:
+        return
+    for farmacia_id in Farmacia.objects.filter(user=instance).values_list('id', flat=True):
+        invalidate_farmacia(farmacia_id)
@@ -1,3 +1,783 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from datetime import date, datetime, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import ChaveIdempotencia, Farmacia, Medicamento, Movimento, Venda, ItemVenda
+from . import ai
+from .cache import build_key, cache_timeout, get_cache, get_or_compute
+from .events import InProcessBroker, RedisBroker, get_broker
+from .prompt_digest import Orcamento, build_digest, estimate_tokens
+from .readers import get_reader
+from .serializers import MedicamentoSerializer, MovimentoSerializer, VendaSerializer
+
+
+def criar_farmacia(email='farmacia@teste.com'):
+    user = User.objects.create_user(username=email, email=email, password='senha-forte-123')
+    farmacia = Farmacia.objects.create(user=user, nome='Farmácia Teste', responsavel='Ana', telefone='11999999999')
+    return user, farmacia
+
+
+@override_settings(CATALOG_CACHE_TIMEOUT=0)
+class FastReadTests(TestCase):
+    def setUp(self):
+        self.user, self.farmacia = criar_farmacia()
+        outro_user, outra_farmacia = criar_farmacia('outra@teste.com')
+
+        self.dipirona = Medicamento.objects.create(
+            farmacia=self.farmacia, nome='Dipirona', quantidade=50, quantidade_minima=10,
+            categoria='Analgésico', preco=Decimal('5.90'), data_vencimento=date(2030, 1, 31))
+        self.amoxicilina = Medicamento.objects.create(
+            farmacia=self.farmacia, nome='Amoxicilina', quantidade=8, quantidade_minima=0,
+            categoria='Antibiótico', preco=Decimal('32'), data_vencimento=date(2029, 6, 1))
+        Medicamento.objects.create(
+            farmacia=outra_farmacia, nome='Outro', quantidade=1, categoria='X',
+            preco=Decimal('1.00'), data_vencimento=date(2030, 1, 1))
+
+        Movimento.objects.create(medicamento=self.dipirona, tipo='entrada', quantidade=20, observacoes='Compra')
+        Movimento.objects.create(medicamento=self.amoxicilina, tipo='saida', quantidade=2)
+
+        venda = Venda.objects.create(farmacia=self.farmacia, total=Decimal('75.80'), forma_pagamento='pix')
+        ItemVenda.objects.create(venda=venda, medicamento=self.dipirona, quantidade=2, preco_unitario=Decimal('5.90'))
+        ItemVenda.objects.create(venda=venda, medicamento=self.amoxicilina, quantidade=2, preco_unitario=Decimal('32.00'))
+        Venda.objects.create(farmacia=self.farmacia, total=Decimal('0.00'), forma_pagamento='dinheiro')
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_reader_matches_serializer(self):
+        casos = [
+            (MedicamentoSerializer, Medicamento.objects.all()),
+            (MovimentoSerializer, Movimento.objects.all()),
+            (VendaSerializer, Venda.objects.all()),
+        ]
+        for serializer_class, queryset in casos:
+            with self.subTest(serializer=serializer_class.__name__):
+                esperado = serializer_class(queryset, many=True).data
+                self.assertEqual(get_reader(serializer_class).read(queryset), esperado)
+
+    def test_list_and_retrieve_are_byte_identical(self):
+        urls = [('/api/medicamentos/', 200), ('/api/movimentos/', 200), ('/api/vendas/', 200),
+                (f'/api/medicamentos/{self.dipirona.id}/', 200), (f'/api/vendas/{Venda.objects.first().id}/', 200),
+                ('/api/vendas/abc/', 404)]
+        for url, esperado in urls:
+            with self.subTest(url=url):
+                with override_settings(FAST_READ_SERIALIZATION=False):
+                    lento = self.client.get(url)
+                with override_settings(FAST_READ_SERIALIZATION=True):
+                    rapido = self.client.get(url)
+                self.assertEqual(lento.status_code, esperado)
+                self.assertEqual(rapido.status_code, esperado)
+                self.assertEqual(rapido.content, lento.content)
+
+    @override_settings(FAST_READ_SERIALIZATION=True)
+    def test_fast_retrieve_respects_tenant(self):
+        outro = Medicamento.objects.exclude(farmacia=self.farmacia).get()
+        response = self.client.get(f'/api/medicamentos/{outro.id}/')
+        self.assertEqual(response.status_code, 404)
+
+
+class LoginTests(TestCase):
+    def setUp(self):
+        self.user, self.farmacia = criar_farmacia()
+        self.client = APIClient()
+
+    def contar_verificacoes(self):
+        return mock.patch.object(
+            PBKDF2PasswordHasher, 'verify', autospec=True, side_effect=PBKDF2PasswordHasher.verify)
+
+    def test_login_verifica_senha_uma_vez(self):
+        with self.contar_verificacoes() as verify:
+            response = self.client.post(
+                '/api/login/', {'username': 'farmacia@teste.com', 'password': 'senha-forte-123'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(verify.call_count, 1)
+        self.assertEqual(response.data['user']['farmacia_id'], self.farmacia.id)
+        self.assertEqual(AccessToken(response.data['access'])['user_id'], self.user.id)
+
+    def test_login_consulta_farmacia_junto_com_usuario(self):
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                '/api/login/', {'username': 'farmacia@teste.com', 'password': 'senha-forte-123'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_login_credenciais_invalidas(self):
+        response = self.client.post(
+            '/api/login/', {'username': 'farmacia@teste.com', 'password': 'errada'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.data['success'])
+
+    def test_register_nao_verifica_senha(self):
+        with self.contar_verificacoes() as verify:
+            response = self.client.post('/api/register/', {
+                'email': 'nova@teste.com', 'senha': 'senha-forte-123', 'farmaciaName': 'Nova',
+                'responsavelName': 'Bia', 'telefone': '11988887777'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(verify.call_count, 0)
+        self.assertEqual(AccessToken(response.data['access'])['user_id'], response.data['user']['id'])
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user, self.farmacia = criar_farmacia()
+        self.medicamento = Medicamento.objects.create(
+            farmacia=self.farmacia, nome='Dipirona', quantidade=50, categoria='Analgésico',
+            preco=Decimal('5.90'), data_vencimento=date(2030, 1, 31))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_segunda_listagem_nao_consulta_banco(self):
+        # force_authenticate: sem a consulta do usuário feita pela autenticação JWT
+        primeira = self.client.get('/api/medicamentos/')
+        with self.assertNumQueries(0):
+            segunda = self.client.get('/api/medicamentos/')
+        self.assertEqual(segunda.content, primeira.content)
+
+    def test_acerto_com_jwt_consulta_apenas_o_usuario(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        client.get('/api/medicamentos/')
+        with self.assertNumQueries(1):
+            client.get('/api/medicamentos/')
+
+    @override_settings(WEB_CONCURRENCY=3)
+    def test_cache_local_com_varios_workers_fica_desativado(self):
+        from .checks import cache_compartilhado
+        self.assertEqual(cache_timeout(), 0)
+        self.assertEqual([aviso.id for aviso in cache_compartilhado(None)], ['api.W001'])
+        self.client.get('/api/medicamentos/')
+        Medicamento.objects.filter(pk=self.medicamento.pk).update(quantidade=1) # sem signal: só o banco muda
+        self.assertEqual(self.client.get('/api/medicamentos/').data[0]['quantidade'], 1)
+
+    def test_movimento_invalida_catalogo(self):
+        self.client.get('/api/medicamentos/')
+        response = self.client.post('/api/movimentos/', {
+            'medicamento': self.medicamento.id, 'tipo': 'saida', 'quantidade': 5}, format='json')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.get(f'/api/medicamentos/{self.medicamento.id}/')
+        self.assertEqual(response.data['quantidade'], 45)
+        self.assertEqual(self.client.get('/api/medicamentos/').data[0]['quantidade'], 45)
+
+    def test_perfil_da_farmacia_invalidado_ao_salvar(self):
+        self.client.get('/api/farmacias/')
+        self.farmacia.nome = 'Novo Nome'
+        self.farmacia.save()
+        self.assertEqual(self.client.get('/api/farmacias/').data[0]['nome'], 'Novo Nome')
+
+    def test_troca_de_dono_da_farmacia(self):
+        novo_dono = User.objects.create_user(username='novo@teste.com', email='novo@teste.com', password='x')
+        self.assertEqual(self.client.get('/api/medicamentos/').data[0]['nome'], 'Dipirona')
+        self.assertEqual(self.client.post('/api/events/ticket/').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.farmacia.user = novo_dono
+            self.farmacia.save()
+        # O dono anterior perde o acesso imediatamente
+        self.assertEqual(self.client.get('/api/medicamentos/').data, [])
+        self.assertEqual(self.client.post('/api/events/ticket/').status_code, 400)
+        self.client.force_authenticate(novo_dono)
+        self.assertEqual(self.client.get('/api/medicamentos/').data[0]['nome'], 'Dipirona')
+
+    def test_entrada_vencida_servida_enquanto_outro_recalcula(self):
+        key = build_key('medicamentos', self.farmacia.id, '/teste/')
+        get_cache().set(key, (0, 'antigo'), 60)
+        get_cache().add(f'{key}:lock', 1, 10)
+        self.assertEqual(get_or_compute(key, lambda: 'novo'), 'antigo')
+        get_cache().delete(f'{key}:lock')
+        self.assertEqual(get_or_compute(key, lambda: 'novo'), 'novo')
+
+    def test_metricas(self):
+        self.client.get('/api/medicamentos/')
+        self.client.get('/api/medicamentos/')
+        self.assertEqual(self.client.get('/api/cache-metrics/').status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        metricas = self.client.get('/api/cache-metrics/').data
+        self.assertEqual(metricas['miss'], 1)
+        self.assertEqual(metricas['hit'], 1)
+
+
+class VendaLoteTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user, self.farmacia = criar_farmacia()
+        _, outra_farmacia = criar_farmacia('outra@teste.com')
+        self.dipirona = Medicamento.objects.create(
+            farmacia=self.farmacia, nome='Dipirona', quantidade=10, categoria='Analgésico',
+            preco=Decimal('5.90'), data_vencimento=date(2030, 1, 31))
+        self.soro = Medicamento.objects.create(
+            farmacia=self.farmacia, nome='Soro', quantidade=3, categoria='Hidratação',
+            preco=Decimal('8.00'), data_vencimento=date(2030, 1, 31))
+        self.alheio = Medicamento.objects.create(
+            farmacia=outra_farmacia, nome='Alheio', quantidade=100, categoria='X',
+            preco=Decimal('1.00'), data_vencimento=date(2030, 1, 31))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def venda(self, client_id, *itens):
+        return {'client_id': client_id, 'forma_pagamento': 'dinheiro', 'itens': [
+            {'medicamento': medicamento.id, 'quantidade': quantidade, 'preco_unitario': str(medicamento.preco)}
+            for medicamento, quantidade in itens]}
+
+    def test_lote_agrega_estoque_e_rejeita_com_motivo(self):
+        response = self.client.post('/api/vendas/lote/', {'vendas': [
+            self.venda('a', (self.dipirona, 4), (self.soro, 1)),
+            self.venda('b', (self.dipirona, 6)),
+            self.venda('c', (self.dipirona, 1)),           # estoque já consumido pelo lote
+            self.venda('d', (self.alheio, 1)),             # medicamento de outra farmácia
+            self.venda('a', (self.soro, 1)),               # client_id repetido
+            {'client_id': 'e', 'forma_pagamento': 'cheque', 'itens': []},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        status_por_id = [(r['client_id'], r['status']) for r in response.data['resultados']]
+        self.assertEqual(status_por_id, [
+            ('a', 'aceita'), ('b', 'aceita'), ('c', 'rejeitada'), ('d', 'rejeitada'),
+            ('a', 'rejeitada'), ('e', 'rejeitada')])
+        self.assertEqual(response.data['aceitas'], 2)
+
+        self.dipirona.refresh_from_db()
+        self.soro.refresh_from_db()
+        self.alheio.refresh_from_db()
+        self.assertEqual((self.dipirona.quantidade, self.soro.quantidade, self.alheio.quantidade), (0, 2, 100))
+
+        venda_a = Venda.objects.get(farmacia=self.farmacia, client_id='a')
+        self.assertEqual(venda_a.total, Decimal('31.60'))
+        self.assertEqual(venda_a.itens.count(), 2)
+
+    def test_reenvio_retorna_duplicada_sem_baixar_estoque(self):
+        lote = {'vendas': [self.venda('x', (self.dipirona, 2))]}
+        primeira = self.client.post('/api/vendas/lote/', lote, format='json')
+        segunda = self.client.post('/api/vendas/lote/', lote, format='json')
+        self.assertEqual(segunda.data['resultados'][0]['status'], 'duplicada')
+        self.assertEqual(segunda.data['resultados'][0]['venda_id'], primeira.data['resultados'][0]['venda_id'])
+        self.dipirona.refresh_from_db()
+        self.assertEqual(self.dipirona.quantidade, 8)
+
+    def test_lote_invalida_catalogo(self):
+        self.client.get('/api/medicamentos/')
+        self.client.post('/api/vendas/lote/', {'vendas': [self.venda('y', (self.soro, 3))]}, format='json')
+        quantidades = {m['nome']: m['quantidade'] for m in self.client.get('/api/medicamentos/').data}
+        self.assertEqual(quantidades['Soro'], 0)
+
+    def test_data_informada_pelo_caixa(self):
+        agora = timezone.now()
+        vendida_em = agora - timedelta(days=3)
+        response = self.client.post('/api/vendas/lote/', {'vendas': [
+            dict(self.venda('antiga', (self.dipirona, 1)), data=vendida_em.isoformat()),
+            self.venda('sem-data', (self.dipirona, 1)),
+            dict(self.venda('futura', (self.dipirona, 1)), data=(agora + timedelta(hours=1)).isoformat()),
+            dict(self.venda('velha', (self.dipirona, 1)), data=(agora - timedelta(days=60)).isoformat()),
+        ]}, format='json')
+        self.assertEqual([r['status'] for r in response.data['resultados']],
+                         ['aceita', 'aceita', 'rejeitada', 'rejeitada'])
+        self.assertIn('data', response.data['resultados'][2]['motivo'])
+        datas = dict(Venda.objects.filter(farmacia=self.farmacia).values_list('client_id', 'data'))
+        self.assertEqual(datas['antiga'], vendida_em)
+        self.assertGreaterEqual(datas['sem-data'], agora)
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user, self.farmacia = criar_farmacia()
+        self.medicamento = Medicamento.objects.create(
+            farmacia=self.farmacia, nome='Dipirona', quantidade=10, categoria='Analgésico',
+            preco=Decimal('5.90'), data_vencimento=date(2030, 1, 31))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def vender(self, chave, quantidade=2):
+        return self.client.post('/api/vendas/', {'forma_pagamento': 'pix', 'total': '0.00', 'itens': [
+            {'medicamento': self.medicamento.id, 'quantidade': quantidade, 'preco_unitario': '5.90'}]},
+            format='json', HTTP_IDEMPOTENCY_KEY=chave)
+
+    def test_repeticao_devolve_resposta_guardada_sem_gravar(self):
+        primeira = self.vender('chave-1')
+        self.assertEqual(primeira.status_code, 201)
+        # A resposta fica no banco, compartilhada entre os workers
+        self.assertEqual(ChaveIdempotencia.objects.get().status, 201)
+        with self.assertNumQueries(1):
+            segunda = self.vender('chave-1')
+        self.assertEqual(segunda.status_code, 201)
+        self.assertEqual(segunda.data, primeira.data)
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+        self.assertEqual(Venda.objects.count(), 1)
+        self.medicamento.refresh_from_db()
+        self.assertEqual(self.medicamento.quantidade, 8)
+
+    def test_mesma_chave_com_outro_conteudo(self):
+        self.vender('chave-2')
+        self.assertEqual(self.vender('chave-2', quantidade=3).status_code, 422)
+
+    def test_duplicata_concorrente_recebe_resposta_da_primeira(self):
+        from . import idempotency
+
+        def outro_worker_confirmou(escopo, chave, fingerprint):
+            # A inserção esperou no índice único até a requisição de outro worker confirmar
+            ChaveIdempotencia.objects.create(escopo=escopo, chave=chave, fingerprint=fingerprint,
+                                             status=201, resposta={'id': 99})
+            raise IntegrityError
+
+        with mock.patch.object(idempotency, '_reivindicar', side_effect=outro_worker_confirmou):
+            response = self.vender('chave-3')
+        self.assertEqual((response.status_code, response.data), (201, {'id': 99}))
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertEqual(Venda.objects.count(), 0)
+
+    def test_chave_em_processamento_retorna_conflito(self):
+        from . import idempotency
+        with mock.patch.object(idempotency, '_reivindicar', side_effect=IntegrityError):
+            self.assertEqual(self.vender('chave-4').status_code, 409)
+        self.assertEqual(Venda.objects.count(), 0)
+
+    def test_chave_expirada_executa_de_novo(self):
+        self.vender('chave-5')
+        ChaveIdempotencia.objects.update(criada_em=timezone.now() - timedelta(days=2))
+        self.assertEqual(self.vender('chave-5').status_code, 201)
+        self.assertEqual(Venda.objects.count(), 2)
+        call_command('limpar_idempotencia', stdout=StringIO())
+        self.assertEqual(ChaveIdempotencia.objects.count(), 1)
+
+    def test_sem_chave_executa_normalmente(self):
+        self.client.post('/api/movimentos/', {'medicamento': self.medicamento.id, 'tipo': 'entrada', 'quantidade': 1}, format='json')
+        self.client.post('/api/movimentos/', {'medicamento': self.medicamento.id, 'tipo': 'entrada', 'quantidade': 1}, format='json')
+        self.assertEqual(Movimento.objects.count(), 2)
+
+
+class AdminTests(TestCase):
+    def setUp(self):
+        self.user, self.farmacia = criar_farmacia()
+        self.admin = User.objects.create_superuser('admin', 'admin@teste.com', 'senha-admin-123')
+        self.client.force_login(self.admin)
+        medicamento = Medicamento.objects.create(
+            farmacia=self.farmacia, nome='Dipirona', quantidade=10, categoria='Analgésico',
+            preco=Decimal('5.90'), data_vencimento=date(2030, 1, 31))
+        self.venda = Venda.objects.create(farmacia=self.farmacia, total=Decimal('5.90'), forma_pagamento='pix')
+        ItemVenda.objects.create(venda=self.venda, medicamento=medicamento, quantidade=1, preco_unitario=Decimal('5.90'))
+        for _ in range(3):
+            Movimento.objects.create(medicamento=medicamento, tipo='entrada', quantidade=1)
+
+    def test_changelists_abrem(self):
+        for modelo in ['farmacia', 'medicamento', 'movimento', 'venda', 'itemvenda']:
+            with self.subTest(modelo=modelo):
+                self.assertEqual(self.client.get(f'/admin/api/{modelo}/').status_code, 200)
+        self.assertEqual(self.client.get(f'/admin/api/venda/{self.venda.id}/change/').status_code, 200)
+
+    def test_changelist_nao_carrega_relacoes_por_linha(self):
+        antes = self.contar_queries('/admin/api/movimento/')
+        medicamento = Medicamento.objects.get()
+        for _ in range(10):
+            Movimento.objects.create(medicamento=medicamento, tipo='saida', quantidade=1)
+        self.assertEqual(self.contar_queries('/admin/api/movimento/'), antes)
+
+    def test_str_nao_carrega_medicamento(self):
+        movimento = Movimento.objects.first()
+        item = ItemVenda.objects.get()
+        with self.assertNumQueries(0):
+            self.assertEqual(str(movimento), f'entrada de 1 unidades do medicamento #{movimento.medicamento_id}')
+            str(item)
+        self.assertEqual(str(Movimento.objects.select_related('medicamento').first()), 'entrada de 1 unidades de Dipirona')
+
+    def test_busca_por_id_e_client_id(self):
+        outra = Venda.objects.create(farmacia=self.farmacia, total=Decimal('1.00'), forma_pagamento='pix',
+                                     client_id='offline-123')
+        item = ItemVenda.objects.get()
+
+        def encontrados(modelo, termo):
+            resposta = self.client.get(f'/admin/api/{modelo}/', {'q': termo})
+            self.assertEqual(resposta.status_code, 200)
+            return {obj.pk for obj in resposta.context['cl'].result_list}
+
+        self.assertEqual(encontrados('venda', str(outra.id)), {outra.id})
+        self.assertEqual(encontrados('venda', 'offline-123'), {outra.id})
+        self.assertEqual(encontrados('venda', 'OFFLINE-123'), set())
+        self.assertEqual(encontrados('itemvenda', str(self.venda.id)), {item.id})
+        self.assertEqual(encontrados('itemvenda', 'dipi'), {item.id})
+        self.assertEqual(encontrados('medicamento', str(item.medicamento_id)), {item.medicamento_id})
+        self.assertEqual(encontrados('farmacia', 'abc'), set())
+
+    def contar_queries(self, url):
+        with CaptureQueriesContext(connection) as contexto:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(contexto.captured_queries)
+
+
+class AiClientTests(TestCase):
+    def setUp(self):
+        ai.reset()
+        self.addCleanup(ai.reset)
+
+    def test_api_nao_importa_sdk_de_ia(self):
+        codigo = (
+            "import sys, django; django.setup(); import api.urls; "
+            "sys.exit(1 if any(m.startswith('google.generativeai') for m in sys.modules) else 0)"
+        )
+        resultado = subprocess.run(
+            [sys.executable, '-c', codigo], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            env=dict(os.environ), capture_output=True)
+        self.assertEqual(resultado.returncode, 0, resultado.stderr)
+
+    def test_modelo_criado_uma_vez_por_processo(self):
+        with mock.patch.object(ai, '_criar_modelo', side_effect=lambda: object()) as criar:
+            primeiro = ai.get_model()
+            self.assertIs(ai.get_model(), primeiro)
+            with mock.patch.object(ai.os, 'getpid', return_value=-1):
+                self.assertIsNot(ai.get_model(), primeiro)
+        self.assertEqual(criar.call_count, 2)
+
+    @override_settings(GEMINI_API_KEY=None)
+    def test_sem_chave_configurada(self):
+        # Falha pela configuração antes de importar o SDK (que pode nem estar instalado)
+        with mock.patch('builtins.__import__', side_effect=AssertionError('SDK importado')):
+            with self.assertRaises(ImproperlyConfigured):
+                ai.get_model()
+
+    @override_settings(GEMINI_API_KEY='chave-teste', GEMINI_MODEL='modelo-teste')
+    def test_modelo_configurado_com_a_chave(self):
+        genai = mock.Mock()
+        google = mock.Mock(generativeai=genai)
+        with mock.patch.dict(sys.modules, {'google': google, 'google.generativeai': genai}):
+            self.assertIs(ai.get_model(), genai.GenerativeModel.return_value)
+        genai.configure.assert_called_once_with(api_key='chave-teste')
+        genai.GenerativeModel.assert_called_once_with('modelo-teste')
+
+
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        self.user, self.farmacia = criar_farmacia()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        def medicamento(nome, categoria, quantidade, preco):
+            return Medicamento.objects.create(
+                farmacia=self.farmacia, nome=nome, quantidade=quantidade, categoria=categoria,
+                preco=Decimal(preco), data_vencimento=date(2030, 1, 31))
+
+        self.campeao = medicamento('Campeão', 'Analgésico', 10, '10.00')
+        self.medio = medicamento('Médio', 'Analgésico', 5, '4.00')
+        self.raro = medicamento('Raro', 'Vitaminas', 2, '1.00')
+        self.parado = medicamento('Parado', 'Vitaminas', 7, '3.00')
+
+        venda = Venda.objects.create(farmacia=self.farmacia, total=Decimal('0'), forma_pagamento='pix')
+        ItemVenda.objects.create(venda=venda, medicamento=self.campeao, quantidade=10, preco_unitario=Decimal('85.00'))
+        ItemVenda.objects.create(venda=venda, medicamento=self.medio, quantidade=5, preco_unitario=Decimal('20.00'))
+        ItemVenda.objects.create(venda=venda, medicamento=self.raro, quantidade=2, preco_unitario=Decimal('25.00'))
+
+        antiga = Venda.objects.create(farmacia=self.farmacia, total=Decimal('0'), forma_pagamento='pix')
+        Venda.objects.filter(pk=antiga.pk).update(data=timezone.now() - timedelta(days=400))
+        ItemVenda.objects.create(venda=antiga, medicamento=self.parado, quantidade=1, preco_unitario=Decimal('3.00'))
+
+    def test_curva_abc_e_estoque(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/analytics/')
+        self.assertEqual(response.status_code, 200)
+        abc = {linha['nome']: linha for linha in response.data['abc']}
+        self.assertEqual([linha['nome'] for linha in response.data['abc']], ['Campeão', 'Médio', 'Raro', 'Parado'])
+        self.assertEqual({nome: linha['classe'] for nome, linha in abc.items()},
+                         {'Campeão': 'A', 'Médio': 'B', 'Raro': 'C', 'Parado': 'C'})
+        self.assertEqual(abc['Campeão']['receita'], '850.00')
+        self.assertEqual(abc['Médio']['sell_through'], 0.5)
+        self.assertEqual(abc['Parado']['unidades_vendidas'], 0)
+
+        valores = {linha['categoria']: linha['valor_estoque'] for linha in response.data['valor_estoque_por_categoria']}
+        self.assertEqual(valores, {'Analgésico': '120.00', 'Vitaminas': '23.00'})
+        self.assertEqual([linha['nome'] for linha in response.data['estoque_parado']], ['Parado'])
+
+    def test_filtro_por_categoria(self):
+        response = self.client.get('/api/analytics/', {'categoria': 'Vitaminas', 'dias': 30})
+        self.assertEqual([linha['nome'] for linha in response.data['abc']], ['Raro', 'Parado'])
+        self.assertEqual(response.data['resumo_abc']['A']['itens'], 1)
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get('/api/analytics/', {'dias': 0}).status_code, 400)
+
+
+class PromptDigestTests(TestCase):
+    def setUp(self):
+        self.user, self.farmacia = criar_farmacia()
+        hoje = timezone.localdate()
+        Medicamento.objects.bulk_create([
+            Medicamento(farmacia=self.farmacia, nome=f'Medicamento {i}', quantidade=20 + i, quantidade_minima=5,
+                        categoria=f'Categoria {i % 6}', preco=Decimal('10.00'),
+                        data_vencimento=hoje + timedelta(days=200 + i))
+            for i in range(300)
+        ])
+        self.negativo = Medicamento.objects.create(
+            farmacia=self.farmacia, nome='Negativo', quantidade=-3, quantidade_minima=5, categoria='Categoria 0',
+            preco=Decimal('5.00'), data_vencimento=hoje + timedelta(days=10))
+        Medicamento.objects.create(
+            farmacia=self.farmacia, nome='Vencido', quantidade=8, categoria='Categoria 1',
+            preco=Decimal('5.00'), data_vencimento=hoje - timedelta(days=1))
+        medicamentos = list(Medicamento.objects.filter(farmacia=self.farmacia)[:300])
+
+        vendas = Venda.objects.bulk_create([
+            Venda(farmacia=self.farmacia, total=Decimal('20.00'), forma_pagamento='pix') for _ in range(200)
+        ])
+        ItemVenda.objects.bulk_create([
+            ItemVenda(venda=venda, medicamento=medicamentos[i % 50], quantidade=2, preco_unitario=Decimal('10.00'))
+            for i, venda in enumerate(vendas)
+        ])
+        Movimento.objects.bulk_create(
+            [Movimento(medicamento=med, tipo='entrada', quantidade=10, observacoes='Compra') for med in medicamentos]
+            + [Movimento(medicamento=med, tipo='saida', quantidade=2) for med in medicamentos[:100]]
+        )
+
+    def test_resumo_respeita_orcamento(self):
+        for orcamento in (300, 1500, 6000):
+            texto, _ = build_digest(self.farmacia, budget_tokens=orcamento)
+            self.assertLessEqual(estimate_tokens(texto), orcamento)
+
+    def test_secao_nunca_passa_do_limite(self):
+        linhas = [f"- Linha de teste número {i} com algum conteúdo" for i in range(40)]
+        for limite in range(20, 401):
+            orcamento = Orcamento(limite)
+            incluidas = orcamento.secao('Seção', linhas)
+            with self.subTest(limite=limite):
+                self.assertLessEqual(orcamento.usado, limite)
+                self.assertLessEqual(estimate_tokens(orcamento.texto()), limite)
+                if 0 < incluidas < len(linhas):
+                    self.assertEqual(orcamento.linhas[-1], f"- (+{len(linhas) - incluidas} omitidos)")
+
+    def test_secoes_e_totais(self):
+        texto, totais = build_digest(self.farmacia, budget_tokens=6000)
+        for secao in ('## Visão geral', '## Alertas e anomalias', '## Vencimentos', '## Estoque por categoria',
+                      '## Tendência semanal', '## Mais vendidos', '## Amostra: vendas mais recentes'):
+            self.assertIn(secao, texto)
+        self.assertIn('1 medicamento(s) com estoque NEGATIVO', texto)
+        self.assertIn('Negativo: estoque -3 (mínimo 5)', texto)
+        self.assertIn('Vencidos: 1; até 30 dias: 1', texto)
+        self.assertEqual(totais, {
+            'total_entradas': 3000,
+            'total_saidas': 200,
+            'total_vendas_valor': Decimal('4000.00'),
+            'medicamentos_em_estoque': sum(20 + i for i in range(300)) - 3 + 8,
+        })
+
+    def test_amostra_acompanha_orcamento(self):
+        pequeno, _ = build_digest(self.farmacia, budget_tokens=1500)
+        grande, _ = build_digest(self.farmacia, budget_tokens=6000)
+        self.assertLess(pequeno.count('- Venda ID:'), grande.count('- Venda ID:'))
+        self.assertNotIn('## Amostra', build_digest(self.farmacia, budget_tokens=300)[0])
+
+    def test_numero_fixo_de_consultas(self):
+        with CaptureQueriesContext(connection) as antes:
+            build_digest(self.farmacia)
+        Venda.objects.bulk_create([
+            Venda(farmacia=self.farmacia, total=Decimal('5.00'), forma_pagamento='pix') for _ in range(100)
+        ])
+        with self.assertNumQueries(len(antes)):
+            build_digest(self.farmacia)
+
+
+class RedisFalso:
+    """Redis pub/sub mínimo em memória, compartilhado pelos brokers de 'workers' diferentes."""
+
+    def __init__(self):
+        self.assinantes = {}
+        self.lock = threading.Lock()
+
+    def publish(self, canal, mensagem):
+        with self.lock:
+            alvos = list(self.assinantes.get(canal, ()))
+        for pubsub in alvos:
+            pubsub.fila.put({'type': 'message', 'channel': canal.encode(), 'data': mensagem.encode()})
+
+    def pubsub(self, **kwargs):
+        return PubSubFalso(self)
+
+
+class PubSubFalso:
+    def __init__(self, redis):
+        self.redis = redis
+        self.fila = queue.Queue()
+
+    def subscribe(self, *canais):
+        with self.redis.lock:
+            for canal in canais:
+                self.redis.assinantes.setdefault(canal, set()).add(self)
+
+    def unsubscribe(self, *canais):
+        with self.redis.lock:
+            for canal in canais:
+                self.redis.assinantes.get(canal, set()).discard(self)
+
+    def get_message(self, timeout):
+        try:
+            return self.fila.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.unsubscribe(*list(self.redis.assinantes))
+
+
+class EventStreamTests(TestCase):
+    def setUp(self):
+        self.user, self.farmacia = criar_farmacia()
+        self.medicamento = Medicamento.objects.create(
+            farmacia=self.farmacia, nome='Dipirona', quantidade=10, categoria='Analgésico',
+            preco=Decimal('5.90'), data_vencimento=date(2030, 1, 31))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_fan_out_com_um_canal_por_farmacia(self):
+        broker = InProcessBroker()
+
+        async def cenario():
+            primeira = broker.assinar(1)
+            segunda = broker.assinar(1)
+            outra = broker.assinar(2)
+            self.assertEqual(len(broker._canais), 2)
+            broker.publicar(1, 'venda', {'id': 7})
+            recebidas = [await primeira.proxima(1), await segunda.proxima(1), await outra.proxima(0.01)]
+            for assinatura in (primeira, segunda, outra):
+                assinatura.fechar()
+            return recebidas
+
+        primeira, segunda, outra = asyncio.run(cenario())
+        self.assertIn('event: venda\ndata: {"id":7}\n\n', primeira)
+        self.assertEqual(primeira, segunda)
+        self.assertIsNone(outra)
+        self.assertEqual(broker._canais, {})
+
+    def test_redis_broker_entrega_entre_workers(self):
+        redis = RedisFalso()
+        worker_a, worker_b = RedisBroker(redis), RedisBroker(redis)
+        canal = 'farmatech:eventos:1'
+
+        def esperar(condicao):
+            for _ in range(100):
+                if condicao():
+                    return
+                time.sleep(0.02)
+            self.fail('thread de escuta não processou a assinatura')
+
+        assinatura = worker_b.assinar(1, assincrona=False)
+        esperar(lambda: redis.assinantes.get(canal))
+        worker_a.publicar(1, 'venda', {'id': 7})
+        self.assertIn('event: venda\ndata: {"id":7}', assinatura.proxima(2))
+        assinatura.fechar()
+        esperar(lambda: not redis.assinantes.get(canal))
+
+    @override_settings(WEB_CONCURRENCY=3, EVENT_BROKER='api.events.InProcessBroker')
+    def test_broker_local_com_varios_workers_gera_aviso(self):
+        from .checks import broker_entre_processos
+        self.assertEqual([aviso.id for aviso in broker_entre_processos(None)], ['api.W002'])
+
+    def test_evento_so_apos_commit(self):
+        assinatura = get_broker().assinar(self.farmacia.id, assincrona=False)
+        self.addCleanup(assinatura.fechar)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post('/api/movimentos/', {
+                'medicamento': self.medicamento.id, 'tipo': 'entrada', 'quantidade': 5}, format='json')
+        self.assertIsNone(assinatura.proxima(0))
+        for callback in callbacks:
+            callback()
+        mensagem = assinatura.proxima(0)
+        self.assertIn('event: movimento', mensagem)
+        self.assertIn('"estoque":15', mensagem)
+
+    def ticket(self):
+        response = self.client.post('/api/events/ticket/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['ticket']
+
+    def test_stream_autenticado_por_ticket_de_uso_unico(self):
+        self.assertEqual(Client().get('/api/events/').status_code, 401)
+        # Token JWT na URL não é aceito (ficaria nos logs de acesso)
+        self.assertEqual(Client().get('/api/events/', {'token': str(AccessToken.for_user(self.user))}).status_code, 401)
+
+        ticket = self.ticket()
+        response = Client().get('/api/events/', {'ticket': ticket})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        conteudo = iter(response.streaming_content)
+        self.assertIn(b'conectado', next(conteudo))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/medicamentos/{self.medicamento.id}/', {'quantidade': 3}, format='json')
+        mensagem = next(conteudo).decode()
+        self.assertIn('event: medicamento', mensagem)
+        self.assertIn('"quantidade":3', mensagem)
+        response.close()
+
+        self.assertEqual(Client().get('/api/events/', {'ticket': ticket}).status_code, 401)
+        self.assertEqual(Client().get('/api/events/', {'ticket': ticket[:-2] + 'xx'}).status_code, 401)
+
+    def test_stream_encerra_quando_o_token_expira(self):
+        token = AccessToken.for_user(self.user)
+        token.set_exp(lifetime=timedelta(seconds=1))
+        response = Client().get('/api/events/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content).decode().split('\n\n')[-2],
+                         'event: expirado\ndata: {}')
+        response.close()
+
+    @override_settings(EVENT_STREAM_MAX_SYNC=1)
+    def test_limite_de_streams_sync_por_worker(self):
+        primeira = Client().get('/api/events/', {'ticket': self.ticket()})
+        self.assertEqual(primeira.status_code, 200)
+        excedente = Client().get('/api/events/', {'ticket': self.ticket()})
+        self.assertEqual(excedente.status_code, 503)
+        self.assertEqual(excedente['Retry-After'], '30')
+        primeira.close() # Libera a vaga mesmo sem o stream ter sido lido
+        segunda = Client().get('/api/events/', {'ticket': self.ticket()})
+        self.assertEqual(segunda.status_code, 200)
+        segunda.close()
+
+class RelatoriosTests(TestCase):
+    def setUp(self):
+        self.user, self.farmacia = criar_farmacia()
+        self.medicamento = Medicamento.objects.create(
+            farmacia=self.farmacia, nome='Dipirona', quantidade=2, quantidade_minima=5, categoria='Analgésico',
+            preco=Decimal('5.90'), data_vencimento=date(2026, 10, 15))
+        venda = Venda.objects.create(farmacia=self.farmacia, total=Decimal('11.80'), forma_pagamento='pix')
+        ItemVenda.objects.create(venda=venda, medicamento=self.medicamento, quantidade=2, preco_unitario=Decimal('5.90'))
+        Movimento.objects.create(medicamento=self.medicamento, tipo='entrada', quantidade=4)
+        data = timezone.make_aware(datetime(2026, 9, 20, 10, 0))
+        Venda.objects.update(data=data)
+        Movimento.objects.update(data=data)
+        self.saida = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.saida)
+
+    def gerar(self, *args):
+        saida = StringIO()
+        call_command('gerar_relatorios', '--mes', '2026-09', '--saida', self.saida, '--processos', '1', *args, stdout=saida)
+        return saida.getvalue()
+
+    def test_gera_csv_e_json_e_retoma(self):
+        self.assertIn('1 a gerar', self.gerar())
+        pasta = os.path.join(self.saida, '2026-09', f'farmacia_{self.farmacia.id}')
+        with open(os.path.join(pasta, 'resumo.json'), encoding='utf-8') as arquivo:
+            resumo = json.load(arquivo)
+        self.assertEqual(resumo['resumo_vendas']['total_vendas'], 1)
+        self.assertEqual(resumo['mais_vendidos'][0]['nome'], 'Dipirona')
+        with open(os.path.join(pasta, 'movimentos.csv'), encoding='utf-8') as arquivo:
+            self.assertEqual(len(list(csv.reader(arquivo))), 2)
+        with open(os.path.join(pasta, 'a_vencer.csv'), encoding='utf-8') as arquivo:
+            self.assertEqual(list(csv.reader(arquivo))[1], ['Dipirona', '2026-10-15', '2', '15'])
+        self.assertTrue(os.path.exists(os.path.join(pasta, 'estoque_baixo.csv')))
+
+        self.assertIn('1 já concluídas, 0 a gerar', self.gerar())
+        self.assertIn('1 a gerar', self.gerar('--refazer'))
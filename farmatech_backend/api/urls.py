@@ -9,8 +9,11 @@ from .views import (
     FarmaciaViewSet,
     MovimentoViewSet,
     VendaViewSet,
-    AiAnalyzeView, # NOVO: Importar a nova view de análise de IA
+    CacheMetricsView,
+    AnalyticsView,
 )
+from .event_views import event_stream_view, EventTicketView # Stream de eventos (SSE) por farmácia
+from .ai_views import AiAnalyzeView # View de análise de IA (separada para não carregar o SDK do Gemini)
 
 # Importar as views JWT
 from rest_framework_simplejwt.views import (
@@ -33,5 +36,9 @@ urlpatterns = [
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 
     path('analyze-ai/', AiAnalyzeView.as_view(), name='ai_analyze'), # NOVO: Rota para análise de IA
+    path('events/', event_stream_view, name='event_stream'),
+    path('events/ticket/', EventTicketView.as_view(), name='event_ticket'),
+    path('analytics/', AnalyticsView.as_view(), name='analytics'),
+    path('cache-metrics/', CacheMetricsView.as_view(), name='cache_metrics'),
     path('', include(router.urls)),
 ]
@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+
+Served through this module, the event stream (/api/events/) keeps each open
+connection as a task on the event loop instead of holding a worker thread.
 """
 
 import os
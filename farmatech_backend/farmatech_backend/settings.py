@@ -12,7 +12,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
+from corsheaders.defaults import default_headers
 from datetime import timedelta # Importe timedelta para configurar a duração dos tokens
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -36,6 +38,7 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:3000",
 ]
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 
 
 # Application definition
@@ -102,6 +105,37 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Com REDIS_URL definido (docker-compose) o cache é compartilhado entre os workers;
+# sem ele, memória local (desenvolvimento e testes). Memória local com mais de um
+# worker desativa o cache do catálogo (ver api/cache.py e api/checks.py).
+
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'farmatech',
+        }
+    }
+
+# Número de processos que atendem a API (exportado pelo gunicorn.conf.py; 1 no runserver)
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+# Cache do catálogo de medicamentos e do perfil da farmácia (api/cache.py)
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_CACHE_TIMEOUT = 300  # segundos; 0 desativa
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -121,6 +155,12 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Backend de autenticação que já carrega a farmácia do usuário (select_related)
+AUTHENTICATION_BACKENDS = [
+    'api.backends.FarmaciaModelBackend',
+]
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -154,6 +194,32 @@ REST_FRAMEWORK = {
     ]
 }
 
+# Caminho rápido de leitura (GET) para listagens grandes, sem ModelSerializer
+# Ver api/readers.py - a saída é idêntica à dos serializers
+FAST_READ_SERIALIZATION = False
+
+# Tempo (segundos) que a resposta de um POST com Idempotency-Key fica guardada
+# (tabela api_chaveidempotencia; as expiradas são removidas por manage.py limpar_idempotencia)
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+
+# Modelo de IA usado em /api/analyze-ai/ (cliente criado sob demanda em api/ai.py)
+GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-1.5-flash-latest')
+# Orçamento (tokens estimados) do resumo de dados enviado no prompt (api/prompt_digest.py)
+AI_PROMPT_TOKEN_BUDGET = int(os.environ.get('AI_PROMPT_TOKEN_BUDGET', 6000))
+
+# Broker dos eventos em tempo real (/api/events/): Redis pub/sub entre os workers;
+# sem REDIS_URL (testes, runserver) a entrega fica dentro do processo
+EVENT_BROKER = 'api.events.RedisBroker' if REDIS_URL else 'api.events.InProcessBroker'
+# Sob WSGI cada stream aberto ocupa uma thread do worker (GUNICORN_THREADS, 4 por padrão);
+# acima deste número por worker o stream recebe 503. Sob ASGI não há limite
+EVENT_STREAM_MAX_SYNC = int(os.environ.get('EVENT_STREAM_MAX_SYNC', 2))
+
+# Máximo de vendas por envio em lote dos caixas (POST /api/vendas/lote/)
+VENDAS_LOTE_MAX = 1000
+# Idade máxima (dias) da data informada pelo caixa em uma venda do lote
+VENDAS_LOTE_DATA_MAX_DIAS = 30
+
 # Configurações do JWT (djangorestframework-simplejwt)
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=5),  # Duração do token de acesso (curto)
@@ -0,0 +1,40 @@
+# farmatech_backend/gunicorn.conf.py
+# Configuração do Gunicorn (carregada automaticamente quando o gunicorn roda nesta pasta)
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Carrega o Django uma vez no processo mestre; os workers herdam a memória via fork
+# (copy-on-write), então sobem mais rápido e ocupam menos RSS no total
+preload_app = True
+
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# O Django lê o número de workers em settings.WEB_CONCURRENCY (ex.: para recusar cache local por processo)
+os.environ['WEB_CONCURRENCY'] = str(workers)
+# Com mais de uma thread o gunicorn usa o worker gthread. Em produção /api/events/
+# é servido pelo serviço ASGI 'events' (-k uvicorn.workers.UvicornWorker, que ignora
+# threads); se o stream cair aqui, cada conexão ocupa uma thread, por isso no
+# máximo EVENT_STREAM_MAX_SYNC delas por worker ficam com streams
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60)) # A análise de IA pode demorar
+graceful_timeout = 30
+keepalive = 5
+
+# Recicla workers periodicamente para conter vazamentos de memória; o jitter evita
+# que todos reiniciem ao mesmo tempo
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = 100
+
+# Heartbeat dos workers em memória em vez de disco (recomendado em containers)
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Conexões abertas no mestre durante o preload não podem ser compartilhadas entre processos
+    from django.db import connections
+    connections.close_all()
@@ -4,3 +4,17 @@ import { twMerge } from "tailwind-merge"
 export function cn(...inputs: ClassValue[]) {
   return twMerge(clsx(inputs))
 }
+
+// UUID v4 para o cabeçalho Idempotency-Key.
+// crypto.randomUUID só existe em contexto seguro (HTTPS ou localhost); servido por
+// HTTP comum o navegador só oferece crypto.getRandomValues, usado como alternativa.
+export function newIdempotencyKey(): string {
+  if (typeof crypto.randomUUID === "function") {
+    return crypto.randomUUID()
+  }
+  const bytes = crypto.getRandomValues(new Uint8Array(16))
+  bytes[6] = (bytes[6] & 0x0f) | 0x40 // versão 4
+  bytes[8] = (bytes[8] & 0x3f) | 0x80 // variante RFC 4122
+  const hex = Array.from(bytes, (byte) => byte.toString(16).padStart(2, "0")).join("")
+  return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`
+}
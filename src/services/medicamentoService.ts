@@ -1,6 +1,7 @@
 // src/services/medicamentoService.ts
 import { Medicamento } from '@/types';
 import { AuthService } from './authService'; // Importa o AuthService para obter o token
+import { newIdempotencyKey } from '@/lib/utils';
 
 export class MedicamentoService {
   private static readonly API_BASE_URL = 'http://127.0.0.1:8000/api';
@@ -71,9 +72,11 @@ export class MedicamentoService {
   // Adicionar um novo medicamento
   static async addMedicamento(medicamentoData: Omit<Medicamento, 'id'>): Promise<Medicamento> {
     try {
+        // Mesma chave no envio original e nas novas tentativas: o backend não repete a gravação
+        const idempotencyKey = newIdempotencyKey();
         const response = await fetch(`${MedicamentoService.API_BASE_URL}/medicamentos/`, {
             method: 'POST',
-            headers: MedicamentoService.getAuthHeaders(),
+            headers: { ...MedicamentoService.getAuthHeaders(), 'Idempotency-Key': idempotencyKey },
             body: JSON.stringify({
                 nome: medicamentoData.nome,
                 quantidade: medicamentoData.quantidade,
@@ -90,7 +93,7 @@ export class MedicamentoService {
                 if (newAccessToken) {
                     const retryResponse = await fetch(`${MedicamentoService.API_BASE_URL}/medicamentos/`, {
                         method: 'POST',
-                        headers: MedicamentoService.getAuthHeaders(),
+                        headers: { ...MedicamentoService.getAuthHeaders(), 'Idempotency-Key': idempotencyKey },
                         body: JSON.stringify({
                             nome: medicamentoData.nome,
                             quantidade: medicamentoData.quantidade,
@@ -2,6 +2,7 @@
 
 import { Movimento } from '@/types';
 import { AuthService } from './authService'; // Para obter o token JWT
+import { newIdempotencyKey } from '@/lib/utils';
 
 export class MovimentoService {
   private static readonly API_BASE_URL = 'http://127.0.0.1:8000/api';
@@ -20,9 +21,11 @@ export class MovimentoService {
   // Método para registrar uma nova movimentação
   static async addMovimento(movimentoData: Omit<Movimento, 'id' | 'data'> & { medicamentoId: number }): Promise<Movimento> {
     try {
+      // Mesma chave no envio original e nas novas tentativas: o backend não repete a gravação
+      const idempotencyKey = newIdempotencyKey();
       const response = await fetch(`${MovimentoService.API_BASE_URL}/movimentos/`, {
         method: 'POST',
-        headers: MovimentoService.getAuthHeaders(),
+        headers: { ...MovimentoService.getAuthHeaders(), 'Idempotency-Key': idempotencyKey },
         body: JSON.stringify({
           medicamento: movimentoData.medicamentoId, // O backend espera 'medicamento' (ID)
           tipo: movimentoData.tipo,
@@ -37,7 +40,7 @@ export class MovimentoService {
             if (newAccessToken) {
                 const retryResponse = await fetch(`${MovimentoService.API_BASE_URL}/movimentos/`, {
                     method: 'POST',
-                    headers: MovimentoService.getAuthHeaders(),
+                    headers: { ...MovimentoService.getAuthHeaders(), 'Idempotency-Key': idempotencyKey },
                     body: JSON.stringify({
                       medicamento: movimentoData.medicamentoId,
                       tipo: movimentoData.tipo,
@@ -3,6 +3,7 @@
 
 import { VendaRegistro } from '@/types';
 import { AuthService } from './authService'; // Para obter o token JWT
+import { newIdempotencyKey } from '@/lib/utils';
 
 
 export class VendaService {
@@ -70,9 +71,11 @@ export class VendaService {
   // Método para adicionar uma nova venda
   static async addVenda(vendaData: Omit<VendaRegistro, 'id' | 'data'>): Promise<VendaRegistro> {
     try {
+        // Mesma chave no envio original e nas novas tentativas: o backend não repete a gravação
+        const idempotencyKey = newIdempotencyKey();
         const response = await fetch(`${VendaService.API_BASE_URL}/vendas/`, {
             method: 'POST',
-            headers: VendaService.getAuthHeaders(),
+            headers: { ...VendaService.getAuthHeaders(), 'Idempotency-Key': idempotencyKey },
             body: JSON.stringify({
                 itens: vendaData.itens.map(item => ({ // Mapear para o formato do backend
                     medicamento: item.medicamento,
@@ -90,7 +93,7 @@ export class VendaService {
                 if (newAccessToken) {
                     const retryResponse = await fetch(`${VendaService.API_BASE_URL}/vendas/`, {
                         method: 'POST',
-                        headers: VendaService.getAuthHeaders(),
+                        headers: { ...VendaService.getAuthHeaders(), 'Idempotency-Key': idempotencyKey },
                         body: JSON.stringify({
                             itens: vendaData.itens.map(item => ({
                                 medicamento: item.medicamento,